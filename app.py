@@ -1,34 +1,153 @@
-from flask import Flask, render_template, jsonify, request, redirect, url_for, flash
+from flask import Flask, render_template, jsonify, request, redirect, url_for, flash, Response, stream_with_context
 import os
-from models import db, Recruit, Contact
+from datetime import datetime, timedelta
+from models import db, Recruit, Contact, is_valid_passphrase
+from pagination import KeysetPage, keyset_query, keyset_select, delta_select, fetch_rows, encode_cursor
+from write_queue import GroupCommitWriter
+from http_cache import PageCache
+from dedup_cache import DedupCache
+from rate_limit import RateLimiter
+from metrics import Metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+import live_feed as feed
+import bulk_ingest
+import db_connection
+import db_migrations
+import db_search
+import db_slowlog
 import sqlite3
 
 app = Flask(__name__)
 
 # Configuration
 app.config['SECRET_KEY'] = 'fsociety_secret_key_by_asero'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///fsociety.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('FSOCIETY_DATABASE_URI', 'sqlite:///fsociety.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLITE_PRAGMAS'] = db_connection.load_pragmas()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = db_connection.engine_options()
+app.config['ADMIN_PAGE_SIZE'] = 50
+app.config['ADMIN_MAX_PAGE_SIZE'] = 500
+
+# Group-commit write pipeline (batch submissions into shared transactions)
+app.config['WRITE_BATCH_ENABLED'] = False
+app.config['WRITE_BATCH_SIZE'] = 100
+app.config['WRITE_BATCH_INTERVAL_MS'] = 5
+
+# Cache rendered static pages and serve them with ETag/Last-Modified validators
+app.config['PAGE_CACHE_ENABLED'] = True
+app.config['PAGE_CACHE_MAX_AGE'] = 300
+
+# Drop repeats of the same form from the same address within the window; the
+# 'sqlite' backend shares the cache between worker processes (DEDUP_SQLITE_PATH,
+# default instance/dedup_cache.db)
+app.config['DEDUP_ENABLED'] = True
+app.config['DEDUP_WINDOW_SECONDS'] = 60
+app.config['DEDUP_MAX_ENTRIES'] = 10000
+app.config['DEDUP_BACKEND'] = 'memory'
+
+# Per-IP token buckets for POST endpoints: endpoint -> (requests, seconds). A client
+# may burst `requests`, then gets one more every seconds/requests; the 'sqlite'
+# backend shares buckets between worker processes (RATE_LIMIT_SQLITE_PATH,
+# default instance/rate_limit.db)
+app.config['RATE_LIMIT_ENABLED'] = True
+app.config['RATE_LIMITS'] = {
+    'join': (5, 60),
+    'contact': (5, 60),
+    'bulk_recruits': (60, 60),
+    'bulk_contacts': (60, 60),
+}
+app.config['RATE_LIMIT_BACKEND'] = 'memory'
+
+# Bulk ingest API limits
+app.config['BULK_MAX_BODY_BYTES'] = 5 * 1024 * 1024
+app.config['BULK_MAX_ROWS'] = 10000
+
+# Per-route latency and per-request query metrics, served at /metrics
+app.config['METRICS_ENABLED'] = True
+
+# Live admin feed: seconds between heartbeats (each also checks the database for rows
+# written by other processes) and the most rows a reconnecting stream catches up on
+app.config['LIVE_FEED_HEARTBEAT'] = 15
+app.config['LIVE_FEED_CATCH_UP_LIMIT'] = 1000
+
+# Log statements slower than this many milliseconds (None disables the slow-query log)
+app.config['SLOW_QUERY_MS'] = db_slowlog.threshold_ms()
+app.config['SLOW_QUERY_LOG'] = db_slowlog.log_path()
 
 # Initialize database
+db_connection.init_app(app)
 db.init_app(app)
+db_slowlog.init_app(app)
 
 # Creator attribution
 CREATOR = "Asero"
 
-# Create database tables
-with app.app_context():
+page_cache = PageCache(app)
+metrics = Metrics(app)
+rate_limiter = RateLimiter(app)
+live_feed = feed.LiveFeed()
+dedup = DedupCache(app)
+metrics.add_collector(dedup.render_metrics)
+
+def init_db():
+    """Create database tables and bring existing databases up to the latest schema"""
     db.create_all()
+    db_migrations.upgrade(db.engine.url.database)
+
+# Schema setup runs before the first request rather than at import, so tools
+# that import this module don't pay for it
+@app.before_first_request
+def prepare_database():
+    init_db()
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create the tables and apply pending schema migrations"""
+    init_db()
+
+writer = GroupCommitWriter(
+    app, db,
+    batch_size=app.config['WRITE_BATCH_SIZE'],
+    interval_ms=app.config['WRITE_BATCH_INTERVAL_MS']
+)
+
+def save_submission(record, dedup_key=None):
+    """Persist a form submission, through the group-commit writer when enabled"""
+    try:
+        if app.config['WRITE_BATCH_ENABLED']:
+            writer.submit(record)
+        else:
+            db.session.add(record)
+            db.session.commit()
+    except Exception:
+        # A failed write must not make the user's retry look like a duplicate
+        if dedup_key:
+            dedup.forget(dedup_key)
+        raise
+    # Wake connected dashboards, which read the new rows themselves
+    if live_feed.listeners:
+        live_feed.publish()
+    return record
+
+def stream_template(template_name, **context):
+    """Render a template incrementally so output is flushed as it is produced"""
+    app.update_template_context(context)
+    template = app.jinja_env.get_template(template_name)
+    stream = template.stream(context)
+    stream.enable_buffering(20)
+    return stream
 
 @app.route('/')
+@page_cache.cached(max_age=app.config['PAGE_CACHE_MAX_AGE'])
 def index():
     return render_template('index.html', creator=CREATOR)
 
 @app.route('/about')
+@page_cache.cached(max_age=app.config['PAGE_CACHE_MAX_AGE'])
 def about():
     return render_template('about.html', creator=CREATOR)
 
 @app.route('/join', methods=['GET', 'POST'])
+@page_cache.cached(max_age=app.config['PAGE_CACHE_MAX_AGE'])
 def join():
     if request.method == 'POST':
         # Extract form data
@@ -38,18 +157,20 @@ def join():
         passphrase = request.form.get('passphrase')
         
         # Validate passphrase
-        if passphrase.lower() in ['debt', 'evil corp', 'the system']:
-            # Save to database
-            recruit = Recruit(
-                handle=handle,
-                skills=skills,
-                message=message,
-                passphrase=passphrase,
-                ip_address=request.remote_addr,
-                user_agent=request.user_agent.string
-            )
-            db.session.add(recruit)
-            db.session.commit()
+        if is_valid_passphrase(passphrase):
+            # A repeat of the same form from the same address gets the same answer without another write
+            dedup_key = dedup.claim('join', (handle, skills, message, passphrase), request.remote_addr)
+            if dedup_key:
+                # Save to database
+                recruit = Recruit(
+                    handle=handle,
+                    skills=skills,
+                    message=message,
+                    passphrase=passphrase,
+                    ip_address=request.remote_addr,
+                    user_agent=request.user_agent.string
+                )
+                save_submission(recruit, dedup_key)
             
             return jsonify({
                 'status': 'success',
@@ -64,6 +185,7 @@ def join():
     return render_template('join.html', creator=CREATOR)
 
 @app.route('/contact', methods=['GET', 'POST'])
+@page_cache.cached(max_age=app.config['PAGE_CACHE_MAX_AGE'])
 def contact():
     if request.method == 'POST':
         # Extract form data
@@ -71,15 +193,16 @@ def contact():
         message = request.form.get('contact-message')
         pgp_key = request.form.get('pgp-key')
         
-        # Save to database
-        contact_msg = Contact(
-            subject=subject,
-            message=message,
-            pgp_key=pgp_key,
-            ip_address=request.remote_addr
-        )
-        db.session.add(contact_msg)
-        db.session.commit()
+        dedup_key = dedup.claim('contact', (subject, message, pgp_key), request.remote_addr)
+        if dedup_key:
+            # Save to database
+            contact_msg = Contact(
+                subject=subject,
+                message=message,
+                pgp_key=pgp_key,
+                ip_address=request.remote_addr
+            )
+            save_submission(contact_msg, dedup_key)
         
         return jsonify({
             'status': 'success',
@@ -89,6 +212,7 @@ def contact():
     return render_template('contact.html', creator=CREATOR)
 
 @app.route('/api/status')
+@page_cache.cached(max_age=60)
 def status():
     return jsonify({
         'status': 'active',
@@ -96,17 +220,232 @@ def status():
         'creator': CREATOR
     })
 
+def bulk_insert(model, validate, extra):
+    """Validate a JSON/NDJSON batch and insert the valid rows in one transaction"""
+    limit = app.config['BULK_MAX_BODY_BYTES']
+    if request.content_length is not None and request.content_length > limit:
+        return jsonify({'status': 'error', 'message': f'Request body exceeds {limit} bytes'}), 413
+    
+    body = request.stream.read(limit + 1)
+    if len(body) > limit:
+        return jsonify({'status': 'error', 'message': f'Request body exceeds {limit} bytes'}), 413
+    
+    try:
+        rows = bulk_ingest.parse_rows(body, request.mimetype)
+    except (bulk_ingest.BulkBodyError, UnicodeDecodeError) as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    if len(rows) > app.config['BULK_MAX_ROWS']:
+        return jsonify({
+            'status': 'error',
+            'message': f"Too many rows (limit {app.config['BULK_MAX_ROWS']})"
+        }), 413
+    
+    results = []
+    accepted = []
+    for index, row in enumerate(rows):
+        values, error = validate(row)
+        if error:
+            results.append({'row': index, 'status': 'error', 'message': error})
+        else:
+            values.update(extra)
+            accepted.append(values)
+            results.append({'row': index, 'status': 'accepted'})
+    
+    # One multi-row INSERT (executemany) inside a single transaction
+    if accepted:
+        db.session.execute(model.__table__.insert(), accepted)
+        db.session.commit()
+        if live_feed.listeners:
+            live_feed.publish()
+    
+    rejected = len(rows) - len(accepted)
+    return jsonify({
+        'status': 'success' if not rejected else ('partial' if accepted else 'error'),
+        'accepted': len(accepted),
+        'rejected': rejected,
+        'results': results
+    }), 200 if accepted or not rows else 400
+
+@app.route('/api/recruits/bulk', methods=['POST'])
+def bulk_recruits():
+    return bulk_insert(Recruit, bulk_ingest.validate_recruit, {
+        'ip_address': request.remote_addr,
+        'user_agent': request.user_agent.string
+    })
+
+@app.route('/api/contacts/bulk', methods=['POST'])
+def bulk_contacts():
+    return bulk_insert(Contact, bulk_ingest.validate_contact, {
+        'ip_address': request.remote_addr
+    })
+
+@app.route('/api/write-queue')
+def write_queue_status():
+    return jsonify({
+        'enabled': app.config['WRITE_BATCH_ENABLED'],
+        **writer.stats()
+    })
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD query argument, raising ValueError if malformed"""
+    return datetime.strptime(value, '%Y-%m-%d')
+
+def admin_api(model, column_names, filters):
+    """Serve admin rows as JSON: a keyset page, or with since_id the rows added after it"""
+    table = model.__table__
+    columns = [table.c[name] for name in column_names]
+    limit = request.args.get('limit', app.config['ADMIN_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, app.config['ADMIN_MAX_PAGE_SIZE']))
+    
+    conditions = [table.c[column] == request.args[name] for name, column in filters.items() if request.args.get(name)]
+    try:
+        if request.args.get('from'):
+            conditions.append(table.c.timestamp >= parse_date(request.args['from']))
+        if request.args.get('to'):
+            # Inclusive of the whole "to" day
+            conditions.append(table.c.timestamp < parse_date(request.args['to']) + timedelta(days=1))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Dates must be YYYY-MM-DD'}), 400
+    
+    since_id = request.args.get('since_id', type=int)
+    if since_id is not None:
+        query = delta_select(columns, table, since_id, conditions)
+    else:
+        query = keyset_select(columns, table, request.args.get('cursor'), conditions)
+    rows, has_more = fetch_rows(db.session, query, limit)
+    
+    result = {'status': 'success', 'count': len(rows), 'has_more': has_more}
+    if since_id is not None:
+        # Pollers pass last_id back as since_id to get only newer rows
+        result['last_id'] = rows[-1]['id'] if rows else since_id
+    else:
+        result['next_cursor'] = encode_cursor(rows[-1]['timestamp'], rows[-1]['id']) if has_more else None
+    
+    for row in rows:
+        if row['timestamp'] is not None:
+            row['timestamp'] = row['timestamp'].isoformat()
+    result['rows'] = rows
+    return jsonify(result)
+
+@app.route('/api/admin/recruits')
+def admin_api_recruits():
+    return admin_api(Recruit, ('id', 'handle', 'skills', 'message', 'status', 'ip_address', 'user_agent', 'timestamp'),
+                     {'status': 'status', 'handle': 'handle'})
+
+@app.route('/api/admin/contacts')
+def admin_api_contacts():
+    return admin_api(Contact, ('id', 'subject', 'message', 'pgp_key', 'ip_address', 'timestamp'), {})
+
+def latest_position():
+    """The newest recruit and contact ids, as a live feed position"""
+    return {kind: db.session.query(db.func.max(model.id)).scalar() or 0
+            for kind, model in (('recruit', Recruit), ('contact', Contact))}
+
+def catch_up_events(position, limit):
+    """Yield events for rows committed after the position, advancing it; None if more than limit are missing"""
+    events = []
+    for kind, model in (('recruit', Recruit), ('contact', Contact)):
+        table = model.__table__
+        columns = [table.c[name] for name in feed.FIELDS[kind]]
+        rows, has_more = fetch_rows(db.session, delta_select(columns, table, position[kind]), limit)
+        if has_more:
+            return None
+        for row in rows:
+            position[kind] = row['id']
+            events.append(feed.format_event(kind, feed.serialize(kind, row), position))
+    # Don't hold a pooled connection while the stream waits
+    db.session.close()
+    return events
+
+@app.route('/admin/stream')
+def admin_stream():
+    """Server-Sent Events feed of new recruits and contacts for the admin dashboard"""
+    position = feed.decode_position(request.headers.get('Last-Event-ID') or request.args.get('last_id'))
+    heartbeat = app.config['LIVE_FEED_HEARTBEAT']
+    limit = app.config['LIVE_FEED_CATCH_UP_LIMIT']
+    
+    def stream(position):
+        with live_feed.subscribe() as sequence:
+            yield "retry: 3000\n\n"
+            if position is None:
+                position = latest_position()
+                db.session.close()
+                yield f"id: {feed.encode_position(position)}\nevent: ready\ndata: {{}}\n\n"
+            
+            # Every wakeup, published or heartbeat, reads all rows after the position from the
+            # database, so resumes, bulk inserts and other workers' writes are never skipped
+            while True:
+                pending = catch_up_events(position, limit)
+                if pending is None:
+                    # Too far behind to replay; the dashboard reloads instead
+                    yield "event: reset\ndata: {}\n\n"
+                    return
+                for event in pending:
+                    yield event
+                
+                published = live_feed.wait(sequence, heartbeat)
+                if published == sequence:
+                    yield ": heartbeat\n\n"
+                sequence = published
+    
+    return Response(stream_with_context(stream(position)), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/admin')
 def admin():
     # A simple admin page to view submissions - in a real app would require authentication
-    recruits = Recruit.query.order_by(Recruit.timestamp.desc()).all()
-    contacts = Contact.query.order_by(Contact.timestamp.desc()).all()
-    return render_template('admin.html', recruits=recruits, contacts=contacts, creator=CREATOR)
+    page_size = request.args.get('page_size', app.config['ADMIN_PAGE_SIZE'], type=int)
+    page_size = max(1, min(page_size, app.config['ADMIN_MAX_PAGE_SIZE']))
+    recruits_after = request.args.get('recruits_after')
+    contacts_after = request.args.get('contacts_after')
+    search_query = request.args.get('q', '').strip()
+    
+    # Full-text search over recruits and contacts via the FTS5 indexes
+    search_results = None
+    if search_query:
+        conn = db.engine.raw_connection()
+        try:
+            search_results = {
+                'recruits': db_search.search_recruits(conn, search_query, page_size),
+                'contacts': db_search.search_contacts(conn, search_query, page_size)
+            }
+        finally:
+            conn.close()
+    
+    # Rows are fetched page by page while the template streams to the client
+    # The first page follows new submissions live, starting from the newest ids
+    live_position = None
+    if not (recruits_after or contacts_after or search_query):
+        live_position = feed.encode_position(latest_position())
+    
+    recruits = KeysetPage(keyset_query(Recruit, recruits_after), page_size)
+    contacts = KeysetPage(keyset_query(Contact, contacts_after), page_size)
+    return Response(stream_with_context(stream_template(
+        'admin.html',
+        recruits=recruits,
+        contacts=contacts,
+        recruits_after=recruits_after,
+        contacts_after=contacts_after,
+        page_size=page_size,
+        search_query=search_query,
+        search_results=search_results,
+        live_position=live_position,
+        creator=CREATOR
+    )))
 
 @app.errorhandler(404)
 def page_not_found(e):
     return render_template('404.html', creator=CREATOR), 404
 
 if __name__ == '__main__':
+    with app.app_context():
+        init_db()
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,331 @@
+#!/usr/bin/env python
+# benchmark.py - FSociety Performance Benchmarks
+# Created by Asero
+#
+# Drives the web routes through the Flask test client and times the db_*
+# tools against generated databases. Results are written as JSON so runs
+# can be compared to catch regressions.
+
+import io
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import sqlite3
+import argparse
+import platform
+import statistics
+import contextlib
+import threading
+import tempfile
+import subprocess
+from datetime import datetime
+import db_seed
+
+# Tool benchmark sizes; --quick runs only QUICK_SIZES
+DEFAULT_SIZES = [10000, 1000000, 10000000]
+QUICK_SIZES = [10000]
+DEFAULT_DATA_DIR = 'bench_data'
+DEFAULT_RESULTS_DIR = 'bench_results'
+
+CLI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'db_cli.py')
+
+# db_cli subcommands timed by the startup suite: (name, arguments)
+STARTUP_COMMANDS = [
+    ('--help', ['--help']),
+    ('stats', ['stats']),
+    ('search', ['search', 'python']),
+    ('backup', ['backup']),
+    ('purge', ['purge', '--yes', '--days', '36500']),
+    ('find-recruit', ['find-recruit', 'ghost']),
+    ('update-status', ['update-status', '1', 'approved']),
+    ('export', ['export', '--days', '1']),
+]
+
+# Median wall-clock targets in milliseconds, interpreter start included. Raw
+# sqlite3 commands never import Flask; the ORM commands still do.
+STARTUP_TARGETS_MS = {
+    '--help': 200,
+    'stats': 200,
+    'search': 200,
+    'backup': 200,
+    'purge': 200,
+    'find-recruit': 200,
+    'update-status': 800,
+    'export': 800,
+}
+
+# Share of generated rows that are recruits; the rest are contacts
+RECRUIT_SHARE = 0.8
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of numbers (nearest rank)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(latencies, elapsed, errors):
+    """Summarize request latencies (seconds) into milliseconds and throughput"""
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def generate_database(database_path, rows, seed=1337):
+    """Create a database holding `rows` generated recruits and contacts"""
+    recruits = int(rows * RECRUIT_SHARE)
+    with contextlib.redirect_stdout(io.StringIO()):
+        db_seed.seed_database(database_path, recruits, rows - recruits, seed=seed)
+
+
+def prepare_database(rows, data_dir=DEFAULT_DATA_DIR):
+    """Return a cached generated database for this size, creating it if needed"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"bench_{rows}.db")
+    if not os.path.exists(path):
+        print(f"Generating {rows:,} row database at {path}...")
+        start_time = time.time()
+        generate_database(path, rows)
+        print(f"✓ Generated in {time.time() - start_time:.2f} seconds")
+    return path
+
+
+def run_load(app, method, path, data, requests, concurrency):
+    """Send `requests` requests split across `concurrency` threads"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    per_worker = max(1, requests // concurrency)
+
+    def worker():
+        client = app.test_client()
+        local = []
+        local_errors = 0
+        for _ in range(per_worker):
+            start = time.perf_counter()
+            response = client.open(path, method=method, data=data)
+            response.get_data()
+            local.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, time.perf_counter() - start_time, errors[0])
+
+
+def bench_web(requests=500, concurrency=8, rows=10000, data_dir=DEFAULT_DATA_DIR):
+    """Benchmark the web routes against a copy of a generated database"""
+    work_path = os.path.abspath(os.path.join(data_dir, 'bench_web.db'))
+    shutil.copy(prepare_database(rows, data_dir), work_path)
+    os.environ['FSOCIETY_DATABASE_URI'] = f"sqlite:///{work_path}"
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import app
+    # Every request comes from one address with the same form, so the limiter and the
+    # dedup cache would turn the write scenarios into 429s and skipped writes
+    app.config['RATE_LIMIT_ENABLED'] = False
+    app.config['DEDUP_ENABLED'] = False
+
+    scenarios = [
+        ('join', 'POST', '/join', {'handle': 'bench', 'skills': 'python', 'message': 'hello', 'passphrase': 'debt'}),
+        ('contact', 'POST', '/contact', {'subject': 'bench', 'contact-message': 'hello'}),
+        ('admin', 'GET', '/admin', None),
+        ('api_status', 'GET', '/api/status', None),
+    ]
+
+    results = {}
+    for name, method, path, data in scenarios:
+        result = run_load(app, method, path, data, requests, concurrency)
+        result["concurrency"] = concurrency
+        results[name] = result
+        print(f"  {name:<12} {result['rps']:>9,.1f} req/s  p50 {result['p50_ms']:.2f} ms  "
+              f"p95 {result['p95_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms  errors {result['errors']}")
+    return results
+
+
+def bench_startup(runs=5, rows=10000, data_dir=DEFAULT_DATA_DIR):
+    """Time a fresh db_cli process for each subcommand against its startup target"""
+    source = prepare_database(rows, data_dir)
+    work_dir = tempfile.mkdtemp(prefix='fsociety_startup_')
+    os.makedirs(os.path.join(work_dir, 'instance'))
+    shutil.copy(source, os.path.join(work_dir, 'instance', 'fsociety.db'))
+
+    results = {}
+    try:
+        for name, arguments in STARTUP_COMMANDS:
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, CLI_PATH] + arguments, cwd=work_dir,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+                timings.append((time.perf_counter() - start) * 1000)
+            median = statistics.median(timings)
+            target = STARTUP_TARGETS_MS.get(name)
+            results[name] = {
+                "median_ms": round(median, 1),
+                "min_ms": round(min(timings), 1),
+                "target_ms": target,
+                "ok": target is None or median <= target,
+            }
+            mark = '✓' if results[name]["ok"] else '✗'
+            print(f"  {mark} {name:<14} {median:>7.1f} ms (target {target} ms)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def time_call(func, *args, **kwargs):
+    """Run a tool function quietly and return its wall time in seconds"""
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args, **kwargs)
+    return round(time.perf_counter() - start_time, 4)
+
+
+def bench_tools(sizes=DEFAULT_SIZES, data_dir=DEFAULT_DATA_DIR):
+    """Time the db_* tools against generated databases of each size"""
+    import db_export
+    import db_backup
+    import db_maintenance
+    import db_stats
+
+    results = {}
+    for rows in sizes:
+        source = prepare_database(rows, data_dir)
+        work_path = os.path.join(data_dir, f"bench_{rows}_work.db")
+        shutil.copy(source, work_path)
+        scratch = os.path.join(data_dir, 'scratch')
+
+        timings = {
+            "get_basic_stats": time_call(db_stats.get_basic_stats, work_path),
+            "get_detailed_stats": time_call(db_stats.get_detailed_stats, work_path),
+            "export_table": time_call(db_export.export_table, work_path, 'recruit', scratch),
+            # Standalone incremental export, opening its own connection as the CLI does
+            "export_incremental": time_call(db_export.export_incremental, work_path, 'recruit', scratch,
+                                            os.path.join(scratch, 'export_state.json')),
+            "backup_database": time_call(db_backup.backup_database, work_path, scratch, quiet=True),
+            # Purge runs last because it changes the data
+            "purge_old_records": time_call(db_maintenance.purge_old_records, work_path, 'recruit', 300),
+        }
+        results[str(rows)] = timings
+
+        shutil.rmtree(scratch, ignore_errors=True)
+        os.remove(work_path)
+        print(f"  {rows:>12,} rows: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in timings.items()))
+    return results
+
+
+def compare_results(previous, current, threshold=0.10):
+    """Print changes against a previous run; return the list of regressions"""
+    regressions = []
+
+    for name, result in current.get('web', {}).items():
+        old = previous.get('web', {}).get(name)
+        if not old:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if old[metric] and result[metric] > old[metric] * (1 + threshold):
+                regressions.append(f"web {name} {metric}: {old[metric]:.2f} -> {result[metric]:.2f} ms")
+        if old['rps'] and result['rps'] < old['rps'] * (1 - threshold):
+            regressions.append(f"web {name} rps: {old['rps']:.1f} -> {result['rps']:.1f}")
+
+    for size, timings in current.get('tools', {}).items():
+        old_timings = previous.get('tools', {}).get(size, {})
+        for name, seconds in timings.items():
+            old = old_timings.get(name)
+            if old and seconds > old * (1 + threshold):
+                regressions.append(f"tools {size} rows {name}: {old:.3f} -> {seconds:.3f} s")
+
+    for name, result in current.get('startup', {}).items():
+        old = previous.get('startup', {}).get(name)
+        if old and result['median_ms'] > old['median_ms'] * (1 + threshold):
+            regressions.append(f"startup {name}: {old['median_ms']:.1f} -> {result['median_ms']:.1f} ms")
+
+    if regressions:
+        print(f"✗ {len(regressions)} regressions over {threshold:.0%}:")
+        for regression in regressions:
+            print(f"  - {regression}")
+    else:
+        print(f"✓ No regressions over {threshold:.0%}")
+    return regressions
+
+
+def save_results(results, output=None, results_dir=DEFAULT_RESULTS_DIR):
+    """Write benchmark results to a JSON file"""
+    if output is None:
+        os.makedirs(results_dir, exist_ok=True)
+        output = os.path.join(results_dir, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output}")
+    return output
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='FSociety Performance Benchmarks')
+    parser.add_argument('--suite', choices=['web', 'tools', 'startup', 'all'], default='all', help='Which benchmarks to run')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per web route')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients per web route')
+    parser.add_argument('--web-rows', type=int, default=10000, help='Rows in the database behind the web benchmark')
+    parser.add_argument('--sizes', default=None,
+                        help='Comma-separated database sizes for the tool benchmarks (default: 10000,1000000,10000000)')
+    parser.add_argument('--quick', action='store_true', help='Time the tools at 10k rows only, skipping the 1M and 10M databases')
+    parser.add_argument('--startup-runs', type=int, default=5, help='Runs per db_cli subcommand in the startup suite')
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help='Where generated databases are cached')
+    parser.add_argument('--output', help='Results file (default: bench_results/bench_<timestamp>.json)')
+    parser.add_argument('--compare', help='Previous results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative slowdown reported as a regression')
+
+    args = parser.parse_args()
+
+    results = {
+        "generated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+    }
+
+    if args.suite in ('web', 'all'):
+        print(f"Web routes ({args.requests} requests, concurrency {args.concurrency}):")
+        results["web"] = bench_web(args.requests, args.concurrency, args.web_rows, args.data_dir)
+
+    if args.suite in ('tools', 'all'):
+        print("Database tools:")
+        if args.sizes:
+            sizes = [int(s) for s in args.sizes.split(',')]
+        else:
+            sizes = QUICK_SIZES if args.quick else DEFAULT_SIZES
+        results["tools"] = bench_tools(sizes, args.data_dir)
+
+    if args.suite in ('startup', 'all'):
+        print(f"db_cli startup ({args.startup_runs} runs each):")
+        results["startup"] = bench_startup(args.startup_runs, args.web_rows, args.data_dir)
+
+    save_results(results, args.output)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            previous = json.load(f)
+        if compare_results(previous, results, args.threshold):
+            sys.exit(1)
@@ -0,0 +1,92 @@
+# bulk_ingest.py - FSociety bulk submission parsing and validation
+# Created by Asero
+
+import json
+from models import is_valid_passphrase
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+# field -> (required, max length), mirroring the column definitions in models.py
+RECRUIT_FIELDS = {
+    'handle': (True, 100),
+    'skills': (True, 200),
+    'message': (True, None),
+    'passphrase': (True, 50),
+}
+
+CONTACT_FIELDS = {
+    'subject': (True, 200),
+    'message': (True, None),
+    'pgp_key': (False, None),
+}
+
+
+class BulkBodyError(ValueError):
+    """The request body could not be parsed as JSON or NDJSON rows"""
+
+
+def parse_rows(body, mimetype):
+    """Parse a JSON array (or {"rows": [...]}) or NDJSON body.
+
+    Returns a list of rows; an NDJSON line that isn't valid JSON becomes a
+    BulkBodyError instance in its slot so it can be reported per row.
+    """
+    text = body.decode('utf-8')
+
+    if mimetype in NDJSON_MIMETYPES:
+        rows = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as e:
+                rows.append(BulkBodyError(f'Invalid JSON: {e}'))
+        return rows
+
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise BulkBodyError(f'Invalid JSON: {e}')
+    if isinstance(data, dict):
+        data = data.get('rows')
+    if not isinstance(data, list):
+        raise BulkBodyError('Expected a JSON array of rows')
+    return data
+
+
+def _clean(row, fields):
+    """Check required fields and lengths, returning (values, error)"""
+    if isinstance(row, BulkBodyError):
+        return None, str(row)
+    if not isinstance(row, dict):
+        return None, 'Row must be a JSON object'
+
+    values = {}
+    for field, (required, max_length) in fields.items():
+        value = row.get(field)
+        if value is None or value == '':
+            if required:
+                return None, f"Missing required field '{field}'"
+            continue
+        if not isinstance(value, str):
+            return None, f"Field '{field}' must be a string"
+        if max_length and len(value) > max_length:
+            return None, f"Field '{field}' exceeds {max_length} characters"
+        values[field] = value
+    return values, None
+
+
+def validate_recruit(row):
+    """Validate a recruit row with the same rules as the join form"""
+    values, error = _clean(row, RECRUIT_FIELDS)
+    if error:
+        return None, error
+    if not is_valid_passphrase(values['passphrase']):
+        return None, 'Security check failed. Rethink your answer.'
+    return values, None
+
+
+def validate_contact(row):
+    """Validate a contact row"""
+    return _clean(row, CONTACT_FIELDS)
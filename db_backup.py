@@ -4,13 +4,48 @@
 
 import os
 import sqlite3
+import db_connection
+import db_backup_store
 import argparse
 import time
+import json
 import shutil
 from datetime import datetime
 
-def backup_database(source_path='instance/fsociety.db', backup_dir='backups'):
-    """Create a backup of the FSociety SQLite database"""
+# Backup defaults: copy everything in one step (0). In WAL mode the copy only holds a
+# read snapshot, so writers carry on; a stepped copy restarts on every write instead
+DEFAULT_BACKUP_PAGES = 0
+DEFAULT_BACKUP_SLEEP = 0.005
+
+# A stepped backup restarted this many times by concurrent writes falls back to one step
+MAX_BACKUP_RESTARTS = 3
+HISTORY_FILE = 'backup_history.jsonl'
+
+def record_backup(backup_dir, entry):
+    """Append a backup run's timing and page counts to the backup history"""
+    with open(os.path.join(backup_dir, HISTORY_FILE), 'a') as f:
+        f.write(json.dumps(entry) + '\n')
+
+class BackupRestarted(Exception):
+    """Raised from the progress callback when writes keep restarting a stepped backup"""
+
+def get_store_dir(backup_dir='backups'):
+    """Return the deduplicated backup store inside a backup directory"""
+    return os.path.join(backup_dir, 'store')
+
+def backup_database(source_path='instance/fsociety.db', backup_dir='backups',
+                    pages=DEFAULT_BACKUP_PAGES, sleep=DEFAULT_BACKUP_SLEEP, quiet=False, store=False, conn=None):
+    """Create a backup of the FSociety SQLite database
+
+    By default the copy runs in a single step, which in WAL mode reads one
+    snapshot without blocking writers. pages > 0 copies in steps of that
+    many pages with a `sleep` second pause between them; SQLite restarts a
+    stepped copy whenever another connection writes, so after
+    MAX_BACKUP_RESTARTS restarts it falls back to one step. With store=True the
+    copy is moved into the deduplicated backup store and the manifest path
+    is returned instead of a .db file. An open connection passed as conn is
+    used as the source and left open.
+    """
     # Ensure backup directory exists
     if not os.path.exists(backup_dir):
         os.makedirs(backup_dir)
@@ -23,19 +58,73 @@ def backup_database(source_path='instance/fsociety.db', backup_dir='backups'):
     if os.path.exists(source_path):
         try:
             # Create connection to source database
-            source_conn = sqlite3.connect(source_path)
+            source_conn = conn or db_connection.connect(source_path)
             
             # Create backup connection
             backup_conn = sqlite3.connect(backup_path)
             
-            # Backup database
-            source_conn.backup(backup_conn)
+            page_size = source_conn.execute("PRAGMA page_size").fetchone()[0]
+            progress_state = {'total': 0, 'steps': 0, 'remaining': None, 'restarts': 0}
+            start_time = time.time()
+            
+            def progress(status, remaining, total):
+                progress_state['total'] = total
+                progress_state['steps'] += 1
+                # Remaining pages going back up means a write restarted the copy
+                if progress_state['remaining'] is not None and remaining > progress_state['remaining']:
+                    progress_state['restarts'] += 1
+                    if progress_state['restarts'] >= MAX_BACKUP_RESTARTS:
+                        raise BackupRestarted()
+                progress_state['remaining'] = remaining
+                if quiet or not total:
+                    return
+                copied = total - remaining
+                elapsed = max(time.time() - start_time, 1e-6)
+                rate_mb = copied * page_size / elapsed / 1024 / 1024
+                print(f"\r  Copied {copied:,}/{total:,} pages ({copied * 100 // total}%, {rate_mb:.2f} MB/s)", end='', flush=True)
+            
+            try:
+                source_conn.backup(backup_conn, pages=pages, progress=progress, sleep=sleep)
+            except BackupRestarted:
+                if not quiet:
+                    print()
+                print(f"  Restarted {progress_state['restarts']} times by concurrent writes, copying in one step")
+                # The aborted copy leaves the target unusable, so start on a fresh file
+                backup_conn.close()
+                os.remove(backup_path)
+                backup_conn = sqlite3.connect(backup_path)
+                source_conn.backup(backup_conn, progress=progress)
+            elapsed = time.time() - start_time
             
             # Close connections
-            source_conn.close()
+            if conn is None:
+                source_conn.close()
             backup_conn.close()
             
+            if not quiet and progress_state['total']:
+                print()
+            
+            total_pages = progress_state['total']
+            total_bytes = total_pages * page_size
+            record_backup(backup_dir, {
+                'backup': os.path.basename(backup_path),
+                'source': source_path,
+                'created_at': timestamp,
+                'duration_seconds': round(elapsed, 3),
+                'pages': total_pages,
+                'page_size': page_size,
+                'bytes': total_bytes,
+                'steps': progress_state['steps'],
+                'pages_per_step': pages,
+                'restarts': progress_state['restarts'],
+                'sleep_seconds': sleep
+            })
+            
             print(f"✓ Database backup successful: {backup_path}")
+            print(f"  {total_pages:,} pages ({total_bytes / 1024 / 1024:.2f} MB) in {elapsed:.2f} seconds")
+            
+            if store:
+                return store_backup_file(backup_path, backup_dir)
             return backup_path
         except sqlite3.Error as e:
             print(f"✗ Backup failed: {e}")
@@ -44,26 +133,52 @@ def backup_database(source_path='instance/fsociety.db', backup_dir='backups'):
         print(f"✗ Source database not found: {source_path}")
         return None
 
-def restore_database(backup_path, target_path='instance/fsociety.db'):
-    """Restore a backup to the FSociety SQLite database"""
-    if not os.path.exists(backup_path):
-        print(f"✗ Backup file not found: {backup_path}")
-        return False
+def store_backup_file(backup_path, backup_dir='backups'):
+    """Move a finished backup file into the deduplicated store"""
+    name = os.path.splitext(os.path.basename(backup_path))[0]
+    try:
+        result = db_backup_store.store_backup(backup_path, name, get_store_dir(backup_dir))
+    except (OSError, ValueError) as e:
+        print(f"✗ Failed to add backup to store, keeping full copy: {e}")
+        return backup_path
+    
+    os.remove(backup_path)
+    print(f"✓ Stored as {result['manifest']}")
+    print(f"  {result['new_chunks']:,} new of {result['chunks']:,} chunks, "
+          f"{result['stored_bytes'] / 1024 / 1024:.2f} MB written for {result['size'] / 1024 / 1024:.2f} MB of data")
+    return result['manifest']
+
+def restore_database(backup_path, target_path='instance/fsociety.db', backup_dir='backups'):
+    """Restore a backup (a .db file or a stored manifest) to the FSociety SQLite database"""
+    manifest_path = None
+    if not os.path.isfile(backup_path) or backup_path.endswith(db_backup_store.MANIFEST_SUFFIX):
+        manifest_path = db_backup_store.find_manifest(backup_path, get_store_dir(backup_dir))
+        if not manifest_path:
+            print(f"✗ Backup file not found: {backup_path}")
+            return False
     
     # Create backup of current database before restoring
     current_backup = None
     if os.path.exists(target_path):
-        current_backup = backup_database(target_path, 'restore_safety')
+        current_backup = backup_database(target_path, 'restore_safety', quiet=True)
         
+    rebuilt_path = None
     try:
         # Make sure target directory exists
         os.makedirs(os.path.dirname(target_path), exist_ok=True)
         
+        # Rebuild stored backups from their chunks next to the target
+        if manifest_path:
+            rebuilt_path = f"{target_path}.restore"
+            store_dir = os.path.dirname(os.path.dirname(manifest_path))
+            db_backup_store.restore_to_file(manifest_path, rebuilt_path, store_dir)
+            backup_path = rebuilt_path
+        
         # Connect to the backup database
         source_conn = sqlite3.connect(backup_path)
         
         # Connect to target database (create if doesn't exist)
-        target_conn = sqlite3.connect(target_path)
+        target_conn = db_connection.connect(target_path)
         
         # Restore database
         source_conn.backup(target_conn)
@@ -72,9 +187,9 @@ def restore_database(backup_path, target_path='instance/fsociety.db'):
         source_conn.close()
         target_conn.close()
         
-        print(f"✓ Database successfully restored from: {backup_path}")
+        print(f"✓ Database successfully restored from: {manifest_path or backup_path}")
         return True
-    except sqlite3.Error as e:
+    except (sqlite3.Error, OSError, ValueError) as e:
         print(f"✗ Restore failed: {e}")
         
         # Try to recover the previous database if restore failed
@@ -87,6 +202,9 @@ def restore_database(backup_path, target_path='instance/fsociety.db'):
                 print(f"✗ Recovery failed: {recovery_error}")
                 
         return False
+    finally:
+        if rebuilt_path and os.path.exists(rebuilt_path):
+            os.remove(rebuilt_path)
 
 def list_backups(backup_dir='backups'):
     """List all available database backups"""
@@ -114,14 +232,46 @@ def list_backups(backup_dir='backups'):
     else:
         print(f"No backups found in '{backup_dir}'")
     
+    # Backups kept in the deduplicated store
+    store_dir = get_store_dir(backup_dir)
+    manifests = db_backup_store.list_manifests(store_dir)
+    if manifests:
+        usage_mb = db_backup_store.store_usage(store_dir) / (1024 * 1024)
+        print(f"Stored backups in '{store_dir}' ({usage_mb:.2f} MB on disk):")
+        for idx, manifest_path in enumerate(manifests, 1):
+            try:
+                manifest = db_backup_store.load_manifest(manifest_path)
+                size_mb = manifest['size'] / (1024 * 1024)
+                print(f"  {idx}. {manifest['name']} ({manifest['created_at']}, {size_mb:.2f} MB)")
+            except Exception:
+                print(f"  {idx}. {os.path.basename(manifest_path)}")
+            backups.append(os.path.basename(manifest_path))
+    
     return backups
 
-def auto_backup(backup_dir='backups', max_backups=10):
+def auto_backup(backup_dir='backups', max_backups=10, pages=DEFAULT_BACKUP_PAGES, sleep=DEFAULT_BACKUP_SLEEP,
+                store=False):
     """Create an automatic backup and maintain only the most recent backups"""
     # Create the backup
-    backup_path = backup_database(backup_dir=backup_dir)
+    backup_path = backup_database(backup_dir=backup_dir, pages=pages, sleep=sleep, store=store)
     
-    if backup_path:
+    if backup_path and store:
+        store_dir = get_store_dir(backup_dir)
+        manifests = db_backup_store.list_manifests(store_dir)
+        
+        # Remove oldest manifests, then the chunks only they referenced
+        while len(manifests) > max_backups:
+            oldest = manifests.pop(0)
+            try:
+                db_backup_store.delete_manifest(oldest)
+                print(f"Removed old backup: {oldest}")
+            except Exception as e:
+                print(f"Failed to remove old backup {oldest}: {e}")
+        
+        freed = db_backup_store.collect_garbage(store_dir)
+        usage = db_backup_store.store_usage(store_dir)
+        print(f"Freed {freed / 1024 / 1024:.2f} MB of unreferenced chunks, store uses {usage / 1024 / 1024:.2f} MB")
+    elif backup_path:
         # List all backups
         all_backups = [os.path.join(backup_dir, f) for f in os.listdir(backup_dir) 
                       if f.startswith('fsociety_backup_') and f.endswith('.db')]
@@ -146,11 +296,15 @@ if __name__ == '__main__':
     backup_parser = subparsers.add_parser('backup', help='Create a database backup')
     backup_parser.add_argument('--source', default='instance/fsociety.db', help='Source database path')
     backup_parser.add_argument('--backup-dir', default='backups', help='Backup directory')
+    backup_parser.add_argument('--pages', type=int, default=DEFAULT_BACKUP_PAGES, help='Pages copied per step (default 0 = all at once in one snapshot)')
+    backup_parser.add_argument('--sleep', type=float, default=DEFAULT_BACKUP_SLEEP, help='Seconds to pause between steps')
+    backup_parser.add_argument('--store', action='store_true', help='Keep the backup in the compressed, deduplicated store')
     
     # Restore command
     restore_parser = subparsers.add_parser('restore', help='Restore a database backup')
-    restore_parser.add_argument('backup', help='Backup file to restore from')
+    restore_parser.add_argument('backup', help='Backup file or stored backup name to restore from')
     restore_parser.add_argument('--target', default='instance/fsociety.db', help='Target database path')
+    restore_parser.add_argument('--backup-dir', default='backups', help='Backup directory holding the store')
     
     # List command
     list_parser = subparsers.add_parser('list', help='List available backups')
@@ -160,18 +314,21 @@ if __name__ == '__main__':
     auto_parser = subparsers.add_parser('auto', help='Create an automatic backup and maintain rotation')
     auto_parser.add_argument('--backup-dir', default='backups', help='Backup directory')
     auto_parser.add_argument('--max', type=int, default=10, help='Maximum number of backups to keep')
+    auto_parser.add_argument('--pages', type=int, default=DEFAULT_BACKUP_PAGES, help='Pages copied per step (default 0 = all at once in one snapshot)')
+    auto_parser.add_argument('--sleep', type=float, default=DEFAULT_BACKUP_SLEEP, help='Seconds to pause between steps')
+    auto_parser.add_argument('--store', action='store_true', help='Keep backups in the compressed, deduplicated store')
     
     # Parse arguments
     args = parser.parse_args()
     
     # Execute command
     if args.command == 'backup':
-        backup_database(args.source, args.backup_dir)
+        backup_database(args.source, args.backup_dir, args.pages, args.sleep, store=args.store)
     elif args.command == 'restore':
-        restore_database(args.backup, args.target)
+        restore_database(args.backup, args.target, args.backup_dir)
     elif args.command == 'list':
         list_backups(args.backup_dir)
     elif args.command == 'auto':
-        auto_backup(args.backup_dir, args.max)
+        auto_backup(args.backup_dir, args.max, args.pages, args.sleep, args.store)
     else:
         parser.print_help()
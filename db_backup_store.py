@@ -0,0 +1,170 @@
+# db_backup_store.py - FSociety Deduplicated Backup Store
+# Created by Asero
+#
+# Backups are split into page-aligned chunks. Each chunk is stored once,
+# zlib-compressed, under its SHA-256 hash, and every backup is described by
+# a small manifest listing its chunks in order. Pages that did not change
+# between backups are shared, so retention costs roughly the size of the
+# changes rather than a full copy per backup.
+#
+#   <store>/chunks/ab/ab12...ef   compressed chunk
+#   <store>/manifests/<name>.json backup manifest
+
+import os
+import json
+import zlib
+import hashlib
+from datetime import datetime
+
+DEFAULT_STORE_DIR = 'backups/store'
+MANIFEST_SUFFIX = '.json'
+
+
+def _chunk_path(store_dir, digest):
+    return os.path.join(store_dir, 'chunks', digest[:2], digest)
+
+
+def _manifest_dir(store_dir):
+    return os.path.join(store_dir, 'manifests')
+
+
+def read_page_size(db_file):
+    """Read the page size from an SQLite database file header"""
+    with open(db_file, 'rb') as f:
+        header = f.read(100)
+    page_size = int.from_bytes(header[16:18], 'big')
+    # A stored value of 1 means 65536
+    return 65536 if page_size == 1 else page_size
+
+
+def store_backup(db_file, name, store_dir=DEFAULT_STORE_DIR, chunk_pages=1, level=6):
+    """Add a database file to the store and write its manifest"""
+    page_size = read_page_size(db_file)
+    chunk_size = page_size * chunk_pages
+    os.makedirs(_manifest_dir(store_dir), exist_ok=True)
+
+    chunks = []
+    new_chunks = 0
+    stored_bytes = 0
+    total_bytes = 0
+
+    with open(db_file, 'rb') as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            total_bytes += len(data)
+            digest = hashlib.sha256(data).hexdigest()
+            chunks.append(digest)
+
+            path = _chunk_path(store_dir, digest)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                compressed = zlib.compress(data, level)
+                temp_path = f"{path}.tmp"
+                with open(temp_path, 'wb') as out:
+                    out.write(compressed)
+                os.replace(temp_path, path)
+                new_chunks += 1
+                stored_bytes += len(compressed)
+
+    manifest = {
+        'name': name,
+        'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'page_size': page_size,
+        'chunk_size': chunk_size,
+        'size': total_bytes,
+        'chunks': chunks
+    }
+    manifest_path = os.path.join(_manifest_dir(store_dir), name + MANIFEST_SUFFIX)
+    temp_path = f"{manifest_path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, manifest_path)
+
+    return {
+        'manifest': manifest_path,
+        'chunks': len(chunks),
+        'new_chunks': new_chunks,
+        'size': total_bytes,
+        'stored_bytes': stored_bytes
+    }
+
+
+def load_manifest(manifest_path):
+    """Load a backup manifest"""
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+
+def find_manifest(name_or_path, store_dir=DEFAULT_STORE_DIR):
+    """Resolve a manifest path from a path or a backup name, or None"""
+    candidates = [
+        name_or_path,
+        os.path.join(_manifest_dir(store_dir), name_or_path),
+        os.path.join(_manifest_dir(store_dir), name_or_path + MANIFEST_SUFFIX),
+    ]
+    for candidate in candidates:
+        if candidate.endswith(MANIFEST_SUFFIX) and os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def list_manifests(store_dir=DEFAULT_STORE_DIR):
+    """Return manifest paths in the store, oldest first"""
+    manifest_dir = _manifest_dir(store_dir)
+    if not os.path.exists(manifest_dir):
+        return []
+    paths = [os.path.join(manifest_dir, f) for f in os.listdir(manifest_dir) if f.endswith(MANIFEST_SUFFIX)]
+    return sorted(paths)
+
+
+def restore_to_file(manifest_path, output_path, store_dir=DEFAULT_STORE_DIR):
+    """Rebuild a database file by streaming its chunks from the store"""
+    manifest = load_manifest(manifest_path)
+
+    with open(output_path, 'wb') as out:
+        for digest in manifest['chunks']:
+            with open(_chunk_path(store_dir, digest), 'rb') as f:
+                data = zlib.decompress(f.read())
+            if hashlib.sha256(data).hexdigest() != digest:
+                raise ValueError(f"Chunk {digest} is corrupt")
+            out.write(data)
+
+    return manifest['size']
+
+
+def delete_manifest(manifest_path):
+    """Remove a backup from the store (its chunks are freed by collect_garbage)"""
+    os.remove(manifest_path)
+
+
+def collect_garbage(store_dir=DEFAULT_STORE_DIR):
+    """Delete chunks no longer referenced by any manifest, returning bytes freed"""
+    referenced = set()
+    for manifest_path in list_manifests(store_dir):
+        referenced.update(load_manifest(manifest_path)['chunks'])
+
+    freed = 0
+    chunk_root = os.path.join(store_dir, 'chunks')
+    if not os.path.exists(chunk_root):
+        return freed
+    for prefix in os.listdir(chunk_root):
+        prefix_dir = os.path.join(chunk_root, prefix)
+        for digest in os.listdir(prefix_dir):
+            if digest not in referenced:
+                path = os.path.join(prefix_dir, digest)
+                freed += os.path.getsize(path)
+                os.remove(path)
+    return freed
+
+
+def store_usage(store_dir=DEFAULT_STORE_DIR):
+    """Return the on-disk size of all stored chunks"""
+    total = 0
+    chunk_root = os.path.join(store_dir, 'chunks')
+    if os.path.exists(chunk_root):
+        for prefix in os.listdir(chunk_root):
+            prefix_dir = os.path.join(chunk_root, prefix)
+            total += sum(os.path.getsize(os.path.join(prefix_dir, d)) for d in os.listdir(prefix_dir))
+    return total
@@ -7,48 +7,100 @@ import os
 import sqlite3
 import csv
 from datetime import datetime
-from flask import Flask
-from models import db, Recruit, Contact
+# Only stdlib-based tool modules are imported up front; Flask and SQLAlchemy
+# are loaded by get_app() for the few commands that use the ORM
+import db_connection
+import db_slowlog
 
-# Create a minimal Flask app context
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///instance/fsociety.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
+# Option defaults, kept in step with db_maintenance.DEFAULT_PURGE_BATCH and
+# db_seed.DEFAULT_BATCH_SIZE without importing those modules for every command
+DEFAULT_PURGE_BATCH = 1000
+DEFAULT_SEED_BATCH_SIZE = 200000
+
+_app = None
+
+def get_app(database):
+    """Create the minimal Flask app context the ORM commands need, on first use"""
+    global _app
+    if _app is None:
+        from flask import Flask
+        from models import db
+        _app = Flask(__name__)
+        _app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.abspath(database)}"
+        _app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        _app.config['SQLITE_PRAGMAS'] = db_connection.load_pragmas()
+        db_connection.init_app(_app)
+        db.init_app(_app)
+        db_slowlog.init_app(_app)
+    return _app
 
 @click.group()
-def cli():
+@click.option('--db', 'database', default=db_connection.DEFAULT_DATABASE, envvar='FSOCIETY_DATABASE',
+              help='Database file (default: instance/fsociety.db)')
+@click.pass_context
+def cli(ctx, database):
     """FSociety Database Management CLI"""
-    pass
+    ctx.obj = database
 
 @cli.command()
-def stats():
+@click.pass_obj
+def stats(database):
     """Show database statistics"""
-    with app.app_context():
-        recruit_count = Recruit.query.count()
-        contact_count = Contact.query.count()
+    from db_stats import read_counters
+    
+    conn = db_connection.connect(database)
+    try:
+        # Counts come from the trigger-maintained counters instead of COUNT(*) scans
+        counters = read_counters(conn)
+        if counters:
+            recruit_count = counters.get(('table', 'recruit'), (0, None))[0]
+            contact_count = counters.get(('table', 'contact'), (0, None))[0]
+        else:
+            recruit_count = conn.execute("SELECT COUNT(*) FROM recruit").fetchone()[0]
+            contact_count = conn.execute("SELECT COUNT(*) FROM contact").fetchone()[0]
         
         click.echo("=== FSociety Database Statistics ===")
         click.echo(f"Total recruitment applications: {recruit_count}")
         click.echo(f"Total contact messages: {contact_count}")
         
         if recruit_count > 0:
-            latest_recruit = Recruit.query.order_by(Recruit.timestamp.desc()).first()
-            click.echo(f"Latest recruit: {latest_recruit.handle} at {latest_recruit.timestamp}")
+            handle, timestamp = conn.execute(
+                "SELECT handle, timestamp FROM recruit ORDER BY timestamp DESC LIMIT 1"
+            ).fetchone()
+            click.echo(f"Latest recruit: {handle} at {timestamp}")
             
         if contact_count > 0:
-            latest_contact = Contact.query.order_by(Contact.timestamp.desc()).first()
-            click.echo(f"Latest contact: {latest_contact.subject} at {latest_contact.timestamp}")
+            subject, timestamp = conn.execute(
+                "SELECT subject, timestamp FROM contact ORDER BY timestamp DESC LIMIT 1"
+            ).fetchone()
+            click.echo(f"Latest contact: {subject} at {timestamp}")
+    finally:
+        conn.close()
 
 @cli.command()
-@click.option('--days', default=7, help='Export records from the last X days')
+@click.option('--days', type=int, default=None,
+              help='Export records from the last X days (default: 7, or every new record with --incremental)')
 @click.option('--output', default='export', help='Output filename prefix')
-def export(days, output):
+@click.option('--incremental', is_flag=True,
+              help='Export only records added since the last incremental export, into exports/')
+@click.option('--state-file', default=None, help='High-water mark file (default: exports/export_state.json)')
+@click.pass_obj
+def export(database, days, output, incremental, state_file):
     """Export database records to CSV"""
+    if incremental:
+        # Shares db_export's state file, so either tool carries on where the other stopped
+        from db_export import export_incremental, DEFAULT_STATE_FILE
+        for table in ('recruit', 'contact'):
+            export_incremental(database, table, state_path=state_file or DEFAULT_STATE_FILE, days=days)
+        return
+    
+    from models import Recruit, Contact
+    
+    days = 7 if days is None else days
     now = datetime.utcnow()
     timestamp = now.strftime("%Y%m%d_%H%M%S")
     
-    with app.app_context():
+    with get_app(database).app_context():
         # Export recruits
         recruits = Recruit.query.filter(
             Recruit.timestamp > now.replace(day=now.day-days)
@@ -100,34 +152,51 @@ def export(days, output):
 @cli.command()
 @click.confirmation_option(prompt='Are you sure you want to purge old records?')
 @click.option('--days', default=30, help='Purge records older than X days')
-def purge(days):
+@click.option('--batch-size', default=DEFAULT_PURGE_BATCH, help='Rows deleted per batch')
+@click.option('--pause', default=0.0, help='Seconds to pause between batches')
+@click.pass_obj
+def purge(database, days, batch_size, pause):
     """Purge old records from the database"""
-    now = datetime.utcnow()
-    cutoff_date = now.replace(day=now.day-days)
+    from db_maintenance import purge_old_records
     
-    with app.app_context():
-        # Delete old recruits
-        old_recruits = Recruit.query.filter(Recruit.timestamp < cutoff_date).all()
-        for recruit in old_recruits:
-            db.session.delete(recruit)
-        
-        # Delete old contacts
-        old_contacts = Contact.query.filter(Contact.timestamp < cutoff_date).all()
-        for contact in old_contacts:
-            db.session.delete(contact)
-            
-        db.session.commit()
-        click.echo(f"Purged {len(old_recruits)} old recruit records")
-        click.echo(f"Purged {len(old_contacts)} old contact records")
+    # Set-based deletes in short id-range batches instead of loading every row into the ORM
+    old_recruits = purge_old_records(database, 'recruit', days, batch_size=batch_size, pause=pause)
+    old_contacts = purge_old_records(database, 'contact', days, batch_size=batch_size, pause=pause)
+    
+    click.echo(f"Purged {old_recruits} old recruit records")
+    click.echo(f"Purged {old_contacts} old contact records")
+
+@cli.command()
+@click.option('--recruits', default=100000, help='Recruit rows to generate')
+@click.option('--contacts', default=25000, help='Contact rows to generate')
+@click.option('--days', default=365, help='Spread timestamps over the last X days')
+@click.option('--seed', type=int, default=None, help='Random seed for reproducible data')
+@click.option('--batch-size', default=DEFAULT_SEED_BATCH_SIZE, help='Rows per transaction')
+@click.option('--defer-search', is_flag=True, help='Leave the full-text search index for build-search')
+@click.pass_obj
+def seed(database, recruits, contacts, days, seed, batch_size, defer_search):
+    """Bulk-generate synthetic recruits and contacts"""
+    from db_seed import seed_database
+    
+    seed_database(database, recruits, contacts, days, seed, batch_size, defer_search=defer_search)
+
+@cli.command('build-search')
+@click.pass_obj
+def build_search(database):
+    """Rebuild the full-text search index after a deferred seed"""
+    from db_seed import build_search_index
+    
+    build_search_index(database)
 
 @cli.command()
-def backup():
+@click.pass_obj
+def backup(database):
     """Create a backup of the database"""
     timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     backup_file = f"fsociety_backup_{timestamp}.db"
     
     # Connect to the database
-    conn = sqlite3.connect('instance/fsociety.db')
+    conn = db_connection.connect(database)
     
     # Create the backup
     backup_conn = sqlite3.connect(backup_file)
@@ -141,27 +210,79 @@ def backup():
 
 @cli.command()
 @click.argument('handle')
-def find_recruit(handle):
+@click.option('--limit', default=50, help='Maximum results')
+@click.pass_obj
+def find_recruit(database, handle, limit):
     """Find a recruit by handle"""
-    with app.app_context():
-        recruits = Recruit.query.filter(Recruit.handle.like(f"%{handle}%")).all()
+    import db_search
+    
+    conn = db_connection.connect(database)
+    
+    try:
+        try:
+            # Word-prefix match through the FTS index, like the admin search
+            recruits = db_search.search_handles(conn, handle, limit)
+        except sqlite3.OperationalError as e:
+            if 'no such table' not in str(e):
+                raise
+            # Not migrated yet: fall back to scanning every handle
+            cursor = conn.execute(
+                "SELECT id, handle, skills, status, timestamp FROM recruit WHERE handle LIKE ? ORDER BY id LIMIT ?",
+                (f"%{handle}%", limit))
+            columns = [col[0] for col in cursor.description]
+            recruits = [dict(zip(columns, row)) for row in cursor.fetchall()]
         
         if recruits:
             click.echo(f"Found {len(recruits)} matches:")
             for recruit in recruits:
-                click.echo(f"ID: {recruit.id}, Handle: {recruit.handle}, Status: {recruit.status}")
-                click.echo(f"  Skills: {recruit.skills}")
-                click.echo(f"  Joined: {recruit.timestamp}")
+                click.echo(f"ID: {recruit['id']}, Handle: {recruit['handle']}, Status: {recruit['status']}")
+                click.echo(f"  Skills: {recruit['skills']}")
+                click.echo(f"  Joined: {recruit['timestamp']}")
                 click.echo("---")
         else:
             click.echo(f"No recruits found matching '{handle}'")
+    finally:
+        conn.close()
+
+@cli.command()
+@click.argument('query')
+@click.option('--table', type=click.Choice(['all', 'recruits', 'contacts']), default='all', help='Which submissions to search')
+@click.option('--limit', default=20, help='Maximum results per table')
+@click.pass_obj
+def search(database, query, table, limit):
+    """Full-text search recruits and contact messages"""
+    import db_search
+    
+    conn = db_connection.connect(database)
+    
+    try:
+        if table in ('all', 'recruits'):
+            recruits = db_search.search_recruits(conn, query, limit)
+            click.echo(f"Found {len(recruits)} matching recruits:")
+            for recruit in recruits:
+                click.echo(f"ID: {recruit['id']}, Handle: {recruit['handle']}, Status: {recruit['status']}")
+                click.echo(f"  {recruit['snippet']}")
+            click.echo("---")
+        
+        if table in ('all', 'contacts'):
+            contacts = db_search.search_contacts(conn, query, limit)
+            click.echo(f"Found {len(contacts)} matching contact messages:")
+            for contact in contacts:
+                click.echo(f"ID: {contact['id']}, Subject: {contact['subject']}")
+                click.echo(f"  {contact['snippet']}")
+            click.echo("---")
+    finally:
+        conn.close()
 
 @cli.command()
 @click.argument('recruit_id', type=int)
 @click.argument('status', type=click.Choice(['pending', 'approved', 'rejected']))
-def update_status(recruit_id, status):
+@click.pass_obj
+def update_status(database, recruit_id, status):
     """Update a recruit's status"""
-    with app.app_context():
+    from models import db, Recruit
+    
+    with get_app(database).app_context():
         recruit = Recruit.query.get(recruit_id)
         
         if recruit:
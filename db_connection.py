@@ -0,0 +1,98 @@
+# db_connection.py - FSociety SQLite Connection Factory
+# Created by Asero
+#
+# Every entry point (the web app and the db_* tools) opens the database
+# through this module so they all agree on journaling and locking behaviour.
+
+import os
+import sqlite3
+import db_slowlog
+
+DEFAULT_DATABASE = 'instance/fsociety.db'
+
+# Connection tuning, overridable with FSOCIETY_SQLITE_<NAME> environment variables
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',       # readers and a writer no longer block each other
+    'synchronous': 'NORMAL',     # safe with WAL, avoids an fsync per commit
+    'busy_timeout': 5000,        # milliseconds to wait for a lock before "database is locked"
+    'mmap_size': 268435456,      # 256 MB of memory-mapped I/O
+    'cache_size': -65536,        # negative values are KiB, so 64 MB of page cache
+    'temp_store': 'MEMORY',
+}
+
+# Connection pool for the web process
+DEFAULT_POOL = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_timeout': 30,
+}
+
+
+def load_pragmas(overrides=None):
+    """Resolve pragma settings from defaults, environment and explicit overrides"""
+    pragmas = dict(DEFAULT_PRAGMAS)
+    for name, default in DEFAULT_PRAGMAS.items():
+        value = os.environ.get(f'FSOCIETY_SQLITE_{name.upper()}')
+        if value is not None:
+            pragmas[name] = int(value) if isinstance(default, int) else value
+    if overrides:
+        pragmas.update(overrides)
+    return pragmas
+
+
+def apply_pragmas(conn, pragmas):
+    """Apply pragma settings to an open DB-API connection"""
+    cursor = conn.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def connect(database_path=DEFAULT_DATABASE, pragmas=None, **kwargs):
+    """Open a tuned sqlite3 connection to the FSociety database"""
+    settings = load_pragmas(pragmas)
+    kwargs.setdefault('timeout', settings['busy_timeout'] / 1000.0)
+    # Statements over FSOCIETY_SLOW_QUERY_MS are written to the slow-query log
+    factory = db_slowlog.connection_factory()
+    if factory is not None:
+        kwargs.setdefault('factory', factory)
+    conn = sqlite3.connect(database_path, **kwargs)
+    apply_pragmas(conn, settings)
+    return conn
+
+
+def engine_options(pool=None):
+    """SQLAlchemy engine options giving the web process a small connection pool"""
+    from sqlalchemy.pool import QueuePool
+
+    options = dict(DEFAULT_POOL)
+    if pool:
+        options.update(pool)
+    options['poolclass'] = QueuePool
+    # Pooled connections are handed between request threads
+    options['connect_args'] = {'check_same_thread': False}
+    return options
+
+
+def tuned_connection_class(pragmas):
+    """A sqlite3.Connection subclass that applies the pragma settings as it opens"""
+    class TunedConnection(sqlite3.Connection):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            apply_pragmas(self, pragmas)
+
+    return TunedConnection
+
+
+def init_app(app):
+    """Tune every SQLite connection the app's SQLAlchemy engine opens
+
+    The pragmas go in through the app's own connect_args as a connection
+    factory, so other apps and engines in the process are left alone, an
+    engine recreated after a config change is still tuned, and calling this
+    twice for one app doesn't apply them twice.
+    """
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    connect_args = options.setdefault('connect_args', {})
+    if 'factory' not in connect_args:
+        connect_args['factory'] = tuned_connection_class(load_pragmas(app.config.get('SQLITE_PRAGMAS')))
@@ -4,22 +4,57 @@
 
 import os
 import csv
+import gzip
+import time
+import json
 import argparse
 import sqlite3
+import db_connection
+import db_migrations
 from datetime import datetime, timedelta
 
-def export_table(database_path, table_name, output_dir='exports', days=None):
-    """Export a database table to a CSV file"""
+DEFAULT_STATE_FILE = 'exports/export_state.json'
+
+def load_export_state(state_path=DEFAULT_STATE_FILE):
+    """Load the last exported id per table from the state file"""
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, 'r') as f:
+        return json.load(f)
+
+def save_export_state(state, state_path=DEFAULT_STATE_FILE):
+    """Persist the last exported id per table, replacing the file atomically"""
+    state_dir = os.path.dirname(state_path)
+    if state_dir and not os.path.exists(state_dir):
+        os.makedirs(state_dir)
+    temp_path = f"{state_path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(temp_path, state_path)
+
+def export_table(database_path, table_name, output_dir='exports', days=None, chunk_size=5000, compress=False, id_range=None,
+                 conn=None):
+    """Export a database table to a CSV file, streaming rows in fixed-size chunks
+
+    id_range=(after_id, up_to_id) limits the export to rows with
+    after_id < id <= up_to_id, read as a primary key range scan. Pass an
+    open connection as conn to reuse it (it is left open).
+    """
     # Ensure output directory exists
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
     # Format timestamp for filename
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    output_path = os.path.join(output_dir, f'{table_name}_export_{timestamp}.csv')
+    extension = 'csv.gz' if compress else 'csv'
+    if id_range is not None:
+        timestamp += f'_ids_{id_range[0] + 1}-{id_range[1]}'
+    output_path = os.path.join(output_dir, f'{table_name}_export_{timestamp}.{extension}')
     
     # Connect to the database
-    conn = sqlite3.connect(database_path)
+    owned = conn is None
+    if owned:
+        conn = db_connection.connect(database_path)
     cursor = conn.cursor()
     
     try:
@@ -29,24 +64,52 @@ def export_table(database_path, table_name, output_dir='exports', days=None):
         
         # Build the query
         query = f"SELECT * FROM {table_name}"
+        conditions = []
+        params = []
         
         # Add date filter if specified
         if days is not None:
             # Assuming the table has a 'timestamp' column
             cutoff_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
-            query += f" WHERE timestamp >= '{cutoff_date}'"
+            conditions.append("timestamp >= ?")
+            params.append(cutoff_date)
+        
+        # Add id range if specified (incremental exports)
+        if id_range is not None:
+            conditions.append("id > ? AND id <= ?")
+            params.extend(id_range)
+        
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if id_range is not None:
+            query += " ORDER BY id"
         
         # Execute query
-        cursor.execute(query)
-        rows = cursor.fetchall()
+        start_time = time.time()
+        cursor.execute(query, params)
         
-        # Write to CSV
-        with open(output_path, 'w', newline='', encoding='utf-8') as csvfile:
+        # Stream to CSV chunk by chunk so memory use doesn't grow with the table
+        row_count = 0
+        if compress:
+            csvfile = gzip.open(output_path, 'wt', newline='', encoding='utf-8', compresslevel=6)
+        else:
+            csvfile = open(output_path, 'w', newline='', encoding='utf-8')
+        with csvfile:
             writer = csv.writer(csvfile)
             writer.writerow(columns)  # Write header
-            writer.writerows(rows)    # Write data
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                row_count += len(rows)
         
-        print(f"✓ Exported {len(rows)} records from '{table_name}' to {output_path}")
+        elapsed = max(time.time() - start_time, 1e-6)
+        size_bytes = os.path.getsize(output_path)
+        
+        print(f"✓ Exported {row_count} records from '{table_name}' to {output_path}")
+        print(f"  {row_count / elapsed:,.0f} rows/s, {size_bytes / elapsed / 1024 / 1024:.2f} MB/s "
+              f"({size_bytes:,} bytes in {elapsed:.2f} seconds)")
         return output_path
     
     except sqlite3.Error as e:
@@ -54,23 +117,65 @@ def export_table(database_path, table_name, output_dir='exports', days=None):
         return None
     
     finally:
-        conn.close()
+        cursor.close()
+        if owned:
+            conn.close()
+
+def export_incremental(database_path, table_name, output_dir='exports', state_path=DEFAULT_STATE_FILE,
+                       days=None, chunk_size=5000, compress=False, conn=None):
+    """Export only the rows added to a table since the last incremental export"""
+    state = load_export_state(state_path)
+    last_id = state.get(table_name, 0)
+    
+    owned = conn is None
+    if owned:
+        conn = db_connection.connect(database_path)
+    try:
+        try:
+            # Fix the upper bound first so rows inserted during the export wait for the next run
+            max_id = conn.execute(f"SELECT MAX(id) FROM {table_name}").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"✗ Export failed: {e}")
+            return None
+        
+        if max_id is None or max_id <= last_id:
+            print(f"No new records in '{table_name}' since id {last_id}")
+            return None
+        
+        output_path = export_table(database_path, table_name, output_dir, days, chunk_size, compress,
+                                   id_range=(last_id, max_id), conn=conn)
+    finally:
+        # Closed only after the export, which reuses this connection
+        if owned:
+            conn.close()
+    
+    if output_path:
+        state[table_name] = max_id
+        save_export_state(state, state_path)
+        print(f"  High-water mark for '{table_name}' moved from id {last_id} to {max_id}")
+    return output_path
 
-def export_all_tables(database_path, output_dir='exports', days=None):
+def export_all_tables(database_path, output_dir='exports', days=None, chunk_size=5000, compress=False,
+                      incremental=False, state_path=DEFAULT_STATE_FILE, conn=None):
     """Export all tables from the database to CSV files"""
-    # Connect to the database
-    conn = sqlite3.connect(database_path)
-    cursor = conn.cursor()
+    # Connect to the database, or share the caller's connection with every table export
+    owned = conn is None
+    if owned:
+        conn = db_connection.connect(database_path)
     
     try:
         # Get all table names
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = [row[0] for row in cursor.fetchall()]
+        tables = db_migrations.user_tables(conn)
         
         # Export each table
         exported_files = []
         for table in tables:
-            output_path = export_table(database_path, table, output_dir, days)
+            if incremental:
+                output_path = export_incremental(database_path, table, output_dir, state_path,
+                                                 days, chunk_size, compress, conn=conn)
+            else:
+                output_path = export_table(database_path, table, output_dir, days, chunk_size, compress,
+                                           conn=conn)
             if output_path:
                 exported_files.append(output_path)
         
@@ -81,7 +186,8 @@ def export_all_tables(database_path, output_dir='exports', days=None):
         return []
     
     finally:
-        conn.close()
+        if owned:
+            conn.close()
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='FSociety Database Export Utility')
@@ -89,11 +195,19 @@ if __name__ == '__main__':
     parser.add_argument('--output-dir', default='exports', help='Output directory for CSV files')
     parser.add_argument('--days', type=int, help='Export records from last N days only')
     parser.add_argument('--table', help='Export specific table only')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Rows fetched and written per chunk')
+    parser.add_argument('--gzip', action='store_true', help='Write gzip-compressed CSV files')
+    parser.add_argument('--incremental', action='store_true', help='Export only rows added since the last incremental run')
+    parser.add_argument('--state-file', default=DEFAULT_STATE_FILE, help='Where incremental exports keep the last exported id per table')
     
     args = parser.parse_args()
     
     # Execute export
-    if args.table:
-        export_table(args.database, args.table, args.output_dir, args.days)
+    if args.table and args.incremental:
+        export_incremental(args.database, args.table, args.output_dir, args.state_file,
+                           args.days, args.chunk_size, args.gzip)
+    elif args.table:
+        export_table(args.database, args.table, args.output_dir, args.days, args.chunk_size, args.gzip)
     else:
-        export_all_tables(args.database, args.output_dir, args.days)
+        export_all_tables(args.database, args.output_dir, args.days, args.chunk_size, args.gzip,
+                          args.incremental, args.state_file)
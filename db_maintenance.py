@@ -4,14 +4,27 @@
 
 import os
 import sqlite3
+import db_connection
 import argparse
 import time
 from datetime import datetime, timedelta
 
+# Rows deleted per purge batch (one short transaction each)
+DEFAULT_PURGE_BATCH = 1000
+
+# Free pages returned to the filesystem per maintenance run
+DEFAULT_VACUUM_PAGE_BUDGET = 2000
+
+# A full VACUUM only runs when at least this share of the file, and this many bytes, is reclaimable
+FULL_VACUUM_MIN_RATIO = 0.25
+FULL_VACUUM_MIN_BYTES = 16 * 1024 * 1024
+
+AUTO_VACUUM_MODES = {0: 'none', 1: 'full', 2: 'incremental'}
+
 def vacuum_database(database_path):
     """Optimize the database by running VACUUM"""
     try:
-        conn = sqlite3.connect(database_path)
+        conn = db_connection.connect(database_path)
         start_time = time.time()
         print(f"Running VACUUM on {database_path}...")
         
@@ -27,16 +40,128 @@ def vacuum_database(database_path):
         print(f"✗ Database optimization failed: {e}")
         return False
 
-def analyze_database(database_path):
+def get_space_stats(database_path, deep=False):
+    """Report page usage, free pages and (with deep=True) in-page fragmentation
+
+    The deep check reads every page through the dbstat table, so it costs
+    a full scan; the default only reads header counters.
+    """
+    try:
+        conn = db_connection.connect(database_path)
+        
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        
+        total_bytes = page_size * page_count
+        free_bytes = page_size * freelist_count
+        stats = {
+            "page_size": page_size,
+            "page_count": page_count,
+            "freelist_count": freelist_count,
+            "auto_vacuum": AUTO_VACUUM_MODES.get(auto_vacuum, str(auto_vacuum)),
+            "total_bytes": total_bytes,
+            "free_bytes": free_bytes,
+            "free_ratio": free_bytes / total_bytes if total_bytes else 0.0,
+            "unused_bytes": None,
+            "reclaimable_bytes": free_bytes
+        }
+        
+        if deep:
+            try:
+                unused = conn.execute("SELECT SUM(unused) FROM dbstat").fetchone()[0] or 0
+                stats["unused_bytes"] = unused
+                stats["reclaimable_bytes"] = free_bytes + unused
+            except sqlite3.OperationalError:
+                print("dbstat is not available in this SQLite build, skipping fragmentation check")
+        
+        stats["reclaimable_ratio"] = stats["reclaimable_bytes"] / total_bytes if total_bytes else 0.0
+        return stats
+    
+    except sqlite3.Error as e:
+        print(f"✗ Failed to read space statistics: {e}")
+        return None
+    
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+def print_space_stats(stats):
+    """Print the output of get_space_stats()"""
+    print(f"Auto-vacuum mode: {stats['auto_vacuum']}")
+    print(f"Pages: {stats['page_count']:,} x {stats['page_size']:,} bytes ({stats['total_bytes']/1024/1024:.2f} MB)")
+    print(f"Free pages: {stats['freelist_count']:,} ({stats['free_ratio']:.1%}, {stats['free_bytes']/1024/1024:.2f} MB)")
+    if stats['unused_bytes'] is not None:
+        print(f"Unused bytes inside pages: {stats['unused_bytes']/1024/1024:.2f} MB")
+    print(f"Reclaimable by full VACUUM: {stats['reclaimable_ratio']:.1%} ({stats['reclaimable_bytes']/1024/1024:.2f} MB)")
+
+def enable_incremental_vacuum(database_path):
+    """Switch the database to auto_vacuum=INCREMENTAL (needs one full VACUUM)"""
+    try:
+        conn = db_connection.connect(database_path)
+        
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            print("✓ Incremental auto-vacuum is already enabled")
+            return True
+        
+        start_time = time.time()
+        print(f"Enabling incremental auto-vacuum on {database_path} (one-time rebuild)...")
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        
+        elapsed = time.time() - start_time
+        print(f"✓ Incremental auto-vacuum enabled in {elapsed:.2f} seconds")
+        return True
+    
+    except sqlite3.Error as e:
+        print(f"✗ Failed to enable incremental auto-vacuum: {e}")
+        return False
+    
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+def reclaim_space(database_path, max_pages=DEFAULT_VACUUM_PAGE_BUDGET, deep=False,
+                  min_ratio=FULL_VACUUM_MIN_RATIO, min_bytes=FULL_VACUUM_MIN_BYTES):
+    """Free space within a page budget, falling back to full VACUUM only when worthwhile"""
+    stats = get_space_stats(database_path, deep)
+    if not stats:
+        return False
+    print_space_stats(stats)
+    
+    # Incremental mode: hand back at most max_pages free pages this run
+    if stats['auto_vacuum'] == 'incremental':
+        if stats['freelist_count']:
+            incremental_vacuum(database_path, max_pages)
+            stats = get_space_stats(database_path, deep)
+        
+        # Free pages left over are for later budgeted runs; only in-page
+        # fragmentation (measured with deep=True) justifies a full rebuild
+        fragmented = stats['unused_bytes'] or 0
+        ratio = fragmented / stats['total_bytes'] if stats['total_bytes'] else 0.0
+        if ratio >= min_ratio and fragmented >= min_bytes:
+            print(f"Unused space inside pages is above {min_ratio:.0%} and {min_bytes/1024/1024:.0f} MB, running full VACUUM")
+            return vacuum_database(database_path)
+    
+    elif stats['reclaimable_ratio'] >= min_ratio and stats['reclaimable_bytes'] >= min_bytes:
+        print(f"Reclaimable space is above {min_ratio:.0%} and {min_bytes/1024/1024:.0f} MB, running full VACUUM")
+        return vacuum_database(database_path)
+    
+    print("Skipping full VACUUM, not enough space to reclaim")
+    return True
+
+def analyze_database(database_path, conn=None):
     """Run ANALYZE to update database statistics"""
+    owned = conn is None
     try:
-        conn = sqlite3.connect(database_path)
+        if owned:
+            conn = db_connection.connect(database_path)
         start_time = time.time()
         print(f"Running ANALYZE on {database_path}...")
         
         # Run ANALYZE to update statistics
         conn.execute("ANALYZE")
-        conn.close()
         
         elapsed = time.time() - start_time
         print(f"✓ Database analysis completed in {elapsed:.2f} seconds")
@@ -45,35 +170,105 @@ def analyze_database(database_path):
     except sqlite3.Error as e:
         print(f"✗ Database analysis failed: {e}")
         return False
+    
+    finally:
+        if owned and conn is not None:
+            conn.close()
+
+def incremental_vacuum(database_path, max_pages=None, conn=None):
+    """Return free pages to the filesystem without rebuilding the database
+
+    Only has an effect when the database uses auto_vacuum=INCREMENTAL;
+    otherwise free pages stay in the file and are reused by later inserts.
+    """
+    owned = conn is None
+    try:
+        if owned:
+            conn = db_connection.connect(database_path)
+        
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            print(f"{free_pages:,} free pages will be reused for new records (incremental vacuum not enabled)")
+            return 0
+        
+        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        start_time = time.time()
+        # incremental_vacuum frees one page per step; executescript runs it to completion
+        if max_pages:
+            conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+        else:
+            conn.executescript("PRAGMA incremental_vacuum;")
+        after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        
+        elapsed = time.time() - start_time
+        print(f"✓ Freed {before - after:,} pages with incremental vacuum in {elapsed:.2f} seconds ({after:,} free pages left)")
+        return before - after
+    
+    except sqlite3.Error as e:
+        print(f"✗ Incremental vacuum failed: {e}")
+        return 0
+    
+    finally:
+        if owned and conn is not None:
+            conn.close()
+
+def purge_old_records(database_path, table, days, status=None, batch_size=DEFAULT_PURGE_BATCH, pause=0.0,
+                      reclaim=True, conn=None, max_pages=DEFAULT_VACUUM_PAGE_BUDGET):
+    """Purge old records from a specific table in bounded id-range batches
 
-def purge_old_records(database_path, table, days, status=None):
-    """Purge old records from a specific table"""
+    Each batch deletes at most batch_size rows inside one id range and
+    commits, so the write lock is only held briefly; `pause` seconds between
+    batches give other writers a turn.
+    """
+    owned = conn is None
     try:
-        conn = sqlite3.connect(database_path)
-        cursor = conn.cursor()
+        if owned:
+            conn = db_connection.connect(database_path)
         
         # Calculate cutoff date
         cutoff_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
         
-        # Build the query
-        query = f"DELETE FROM {table} WHERE timestamp < ?"
+        # Build the filter
+        condition = "timestamp < ?"
         params = [cutoff_date]
         
         # Add status condition if provided
         if status:
-            query += " AND status = ?"
+            condition += " AND status = ?"
             params.append(status)
         
-        # Execute query
-        cursor.execute(query, params)
-        deleted_count = cursor.rowcount
-        conn.commit()
+        start_time = time.time()
+        deleted_count = 0
+        batches = 0
+        last_id = 0
+        
+        while True:
+            # Find the id range covering the next batch of matching rows
+            lo, hi = conn.execute(
+                f"SELECT MIN(id), MAX(id) FROM "
+                f"(SELECT id FROM {table} WHERE id > ? AND {condition} ORDER BY id LIMIT ?)",
+                [last_id] + params + [batch_size]
+            ).fetchone()
+            if lo is None:
+                break
+            
+            cursor = conn.execute(f"DELETE FROM {table} WHERE id BETWEEN ? AND ? AND {condition}", [lo, hi] + params)
+            conn.commit()
+            
+            deleted_count += cursor.rowcount
+            batches += 1
+            last_id = hi
+            
+            if pause:
+                time.sleep(pause)
         
-        print(f"✓ Purged {deleted_count} records from '{table}' older than {days} days")
+        elapsed = time.time() - start_time
+        print(f"✓ Purged {deleted_count} records from '{table}' older than {days} days "
+              f"({batches} batches in {elapsed:.2f} seconds)")
         
-        # Run VACUUM to reclaim space if records were deleted
-        if deleted_count > 0:
-            vacuum_database(database_path)
+        # Free the deleted pages without a full VACUUM, within the page budget
+        if deleted_count > 0 and reclaim:
+            incremental_vacuum(database_path, max_pages, conn=conn)
             
         return deleted_count
     
@@ -82,7 +277,8 @@ def purge_old_records(database_path, table, days, status=None):
         return 0
     
     finally:
-        conn.close()
+        if owned and conn is not None:
+            conn.close()
 
 def check_database_size(database_path):
     """Check the size of the database file"""
@@ -118,9 +314,9 @@ def full_maintenance(database_path):
     print("\nUpdating database statistics:")
     analyze_database(database_path)
     
-    # Run VACUUM
+    # Free space within a page budget; full VACUUM only when it pays off
     print("\nOptimizing database:")
-    vacuum_database(database_path)
+    reclaim_space(database_path)
     
     # Check final size
     print("\nFinal database status:")
@@ -144,6 +340,23 @@ if __name__ == '__main__':
     vacuum_parser = subparsers.add_parser('vacuum', help='Optimize database with VACUUM')
     vacuum_parser.add_argument('--database', default='instance/fsociety.db', help='Database path')
     
+    # Space command
+    space_parser = subparsers.add_parser('space', help='Show free pages and fragmentation')
+    space_parser.add_argument('--database', default='instance/fsociety.db', help='Database path')
+    space_parser.add_argument('--deep', action='store_true', help='Also measure unused space inside pages (full scan)')
+    
+    # Enable incremental auto-vacuum command
+    enable_parser = subparsers.add_parser('enable-incremental', help='Convert the database to incremental auto-vacuum')
+    enable_parser.add_argument('--database', default='instance/fsociety.db', help='Database path')
+    
+    # Reclaim command
+    reclaim_parser = subparsers.add_parser('reclaim', help='Free pages within a budget, full VACUUM only if worthwhile')
+    reclaim_parser.add_argument('--database', default='instance/fsociety.db', help='Database path')
+    reclaim_parser.add_argument('--pages', type=int, default=DEFAULT_VACUUM_PAGE_BUDGET, help='Maximum pages to free this run')
+    reclaim_parser.add_argument('--deep', action='store_true', help='Include in-page fragmentation when deciding on a full VACUUM')
+    reclaim_parser.add_argument('--min-ratio', type=float, default=FULL_VACUUM_MIN_RATIO, help='Reclaimable share needed for a full VACUUM')
+    reclaim_parser.add_argument('--min-mb', type=float, default=FULL_VACUUM_MIN_BYTES / 1024 / 1024, help='Reclaimable MB needed for a full VACUUM')
+    
     # Analyze command
     analyze_parser = subparsers.add_parser('analyze', help='Update database statistics')
     analyze_parser.add_argument('--database', default='instance/fsociety.db', help='Database path')
@@ -154,6 +367,9 @@ if __name__ == '__main__':
     purge_parser.add_argument('--table', required=True, help='Table name to purge from')
     purge_parser.add_argument('--days', type=int, required=True, help='Purge records older than N days')
     purge_parser.add_argument('--status', help='Only purge records with this status')
+    purge_parser.add_argument('--batch-size', type=int, default=DEFAULT_PURGE_BATCH, help='Rows deleted per batch')
+    purge_parser.add_argument('--pause', type=float, default=0.0, help='Seconds to pause between batches')
+    purge_parser.add_argument('--pages', type=int, default=DEFAULT_VACUUM_PAGE_BUDGET, help='Maximum pages to free after the purge')
     
     # Check size command
     size_parser = subparsers.add_parser('size', help='Check database file size')
@@ -169,10 +385,19 @@ if __name__ == '__main__':
     # Execute command
     if args.command == 'vacuum':
         vacuum_database(args.database)
+    elif args.command == 'space':
+        stats = get_space_stats(args.database, args.deep)
+        if stats:
+            print_space_stats(stats)
+    elif args.command == 'enable-incremental':
+        enable_incremental_vacuum(args.database)
+    elif args.command == 'reclaim':
+        reclaim_space(args.database, args.pages, args.deep, args.min_ratio, int(args.min_mb * 1024 * 1024))
     elif args.command == 'analyze':
         analyze_database(args.database)
     elif args.command == 'purge':
-        purge_old_records(args.database, args.table, args.days, args.status)
+        purge_old_records(args.database, args.table, args.days, args.status, args.batch_size, args.pause,
+                          max_pages=args.pages)
     elif args.command == 'size':
         check_database_size(args.database)
     elif args.command == 'full':
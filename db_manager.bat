@@ -155,7 +155,8 @@ echo  1. Run full maintenance
 echo  2. Check database size
 echo  3. Optimize database (VACUUM)
 echo  4. Purge old rejected recruits (30+ days)
-echo  5. Return to main menu
+echo  5. Run backup, purge, analyze, stats and export in one pass
+echo  6. Return to main menu
 echo =================================================================
 
 set /p maint_choice=Enter choice: 
@@ -184,6 +185,12 @@ if "%maint_choice%"=="4" (
     pause
     goto maintenance
 )
+if "%maint_choice%"=="5" (
+    py db_pipeline.py "backup,purge:table=recruit;days=30;status=rejected,analyze,stats,export" --database instance/fsociety.db
+    echo.
+    pause
+    goto maintenance
+)
 goto menu
 
 :cli
@@ -145,7 +145,8 @@ function Show-Maintenance {
     Write-Host "  2. Check database size"
     Write-Host "  3. Optimize database (VACUUM)"
     Write-Host "  4. Purge old rejected recruits (30+ days)"
-    Write-Host "  5. Return to main menu"
+    Write-Host "  5. Run backup, purge, analyze, stats and export in one pass"
+    Write-Host "  6. Return to main menu"
     Write-Host "=================================================================" -ForegroundColor DarkGray
     
     $choice = Read-Host "Enter choice"
@@ -175,6 +176,12 @@ function Show-Maintenance {
             Read-Host "Press Enter to continue"
             Show-Maintenance
         }
+        "5" {
+            python db_pipeline.py "backup,purge:table=recruit;days=30;status=rejected,analyze,stats,export" --database instance/fsociety.db
+            Write-Host ""
+            Read-Host "Press Enter to continue"
+            Show-Maintenance
+        }
     }
 }
 
@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+# db_migrations.py - FSociety Schema Migrations
+# Created by Asero
+#
+# db.create_all() only creates missing tables, so anything added to an
+# existing fsociety.db (indexes, triggers, helper tables) lives here as a
+# numbered migration. The applied version is kept in PRAGMA user_version.
+
+import argparse
+import sqlite3
+import time
+import db_connection
+
+# Recompute derived counters from the base tables (also used after bulk loads)
+REBUILD_COUNTERS = [
+    "DELETE FROM stats_counter",
+    "INSERT INTO stats_counter SELECT 'table', 'recruit', COUNT(*), MAX(timestamp) FROM recruit",
+    "INSERT INTO stats_counter SELECT 'table', 'contact', COUNT(*), MAX(timestamp) FROM contact",
+    """INSERT INTO stats_counter
+        SELECT 'recruit_status', IFNULL(status, 'unknown'), COUNT(*), MAX(timestamp)
+        FROM recruit GROUP BY IFNULL(status, 'unknown')""",
+]
+
+# Rebuild the activity rollup from the rows currently in the base tables
+REBUILD_ROLLUP = [
+    "DELETE FROM activity_rollup",
+] + [
+    f"""INSERT INTO activity_rollup (table_name, granularity, bucket, count)
+        SELECT '{table}', '{granularity}', strftime('{bucket_format}', timestamp) AS bucket, COUNT(*)
+        FROM {table} WHERE timestamp IS NOT NULL GROUP BY bucket"""
+    for table in ('recruit', 'contact')
+    for granularity, bucket_format in (('day', '%Y-%m-%d'), ('hour', '%Y-%m-%d %H:00'))
+]
+
+def _rollup_trigger(table):
+    return f"""CREATE TRIGGER IF NOT EXISTS {table}_rollup_insert AFTER INSERT ON {table}
+        WHEN new.timestamp IS NOT NULL BEGIN
+            INSERT INTO activity_rollup (table_name, granularity, bucket, count)
+            VALUES ('{table}', 'day', strftime('%Y-%m-%d', new.timestamp), 1)
+                ON CONFLICT (table_name, granularity, bucket) DO UPDATE SET count = count + 1;
+            INSERT INTO activity_rollup (table_name, granularity, bucket, count)
+            VALUES ('{table}', 'hour', strftime('%Y-%m-%d %H:00', new.timestamp), 1)
+                ON CONFLICT (table_name, granularity, bucket) DO UPDATE SET count = count + 1;
+        END"""
+
+# (version, description, statements)
+MIGRATIONS = [
+    (1, 'Add timestamp, status and handle indexes', [
+        "CREATE INDEX IF NOT EXISTS ix_recruit_timestamp_id ON recruit (timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS ix_recruit_status_timestamp ON recruit (status, timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_recruit_handle ON recruit (handle)",
+        "CREATE INDEX IF NOT EXISTS ix_contact_timestamp_id ON contact (timestamp, id)",
+    ]),
+    (2, 'Add FTS5 search indexes for recruits and contacts', [
+        # External-content tables: the text lives in recruit/contact, FTS only stores the index
+        """CREATE VIRTUAL TABLE IF NOT EXISTS recruit_fts USING fts5(
+            handle, skills, message,
+            content='recruit', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS recruit_fts_insert AFTER INSERT ON recruit BEGIN
+            INSERT INTO recruit_fts (rowid, handle, skills, message)
+            VALUES (new.id, new.handle, new.skills, new.message);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS recruit_fts_delete AFTER DELETE ON recruit BEGIN
+            INSERT INTO recruit_fts (recruit_fts, rowid, handle, skills, message)
+            VALUES ('delete', old.id, old.handle, old.skills, old.message);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS recruit_fts_update AFTER UPDATE OF handle, skills, message ON recruit BEGIN
+            INSERT INTO recruit_fts (recruit_fts, rowid, handle, skills, message)
+            VALUES ('delete', old.id, old.handle, old.skills, old.message);
+            INSERT INTO recruit_fts (rowid, handle, skills, message)
+            VALUES (new.id, new.handle, new.skills, new.message);
+        END""",
+        "INSERT INTO recruit_fts (recruit_fts) VALUES ('rebuild')",
+        """CREATE VIRTUAL TABLE IF NOT EXISTS contact_fts USING fts5(
+            subject, message,
+            content='contact', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS contact_fts_insert AFTER INSERT ON contact BEGIN
+            INSERT INTO contact_fts (rowid, subject, message)
+            VALUES (new.id, new.subject, new.message);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS contact_fts_delete AFTER DELETE ON contact BEGIN
+            INSERT INTO contact_fts (contact_fts, rowid, subject, message)
+            VALUES ('delete', old.id, old.subject, old.message);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS contact_fts_update AFTER UPDATE OF subject, message ON contact BEGIN
+            INSERT INTO contact_fts (contact_fts, rowid, subject, message)
+            VALUES ('delete', old.id, old.subject, old.message);
+            INSERT INTO contact_fts (rowid, subject, message)
+            VALUES (new.id, new.subject, new.message);
+        END""",
+        "INSERT INTO contact_fts (contact_fts) VALUES ('rebuild')",
+    ]),
+    (3, 'Add trigger-maintained record counters', [
+        """CREATE TABLE IF NOT EXISTS stats_counter (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            latest TIMESTAMP,
+            PRIMARY KEY (scope, key)
+        ) WITHOUT ROWID""",
+        """CREATE TRIGGER IF NOT EXISTS recruit_stats_insert AFTER INSERT ON recruit BEGIN
+            INSERT INTO stats_counter (scope, key, count, latest) VALUES ('table', 'recruit', 1, new.timestamp)
+                ON CONFLICT (scope, key) DO UPDATE SET count = count + 1,
+                    latest = CASE WHEN latest IS NULL OR excluded.latest > latest THEN excluded.latest ELSE latest END;
+            INSERT INTO stats_counter (scope, key, count, latest) VALUES ('recruit_status', IFNULL(new.status, 'unknown'), 1, new.timestamp)
+                ON CONFLICT (scope, key) DO UPDATE SET count = count + 1,
+                    latest = CASE WHEN latest IS NULL OR excluded.latest > latest THEN excluded.latest ELSE latest END;
+        END""",
+        # Latest timestamps are only recomputed (an index lookup) when the newest row goes away
+        """CREATE TRIGGER IF NOT EXISTS recruit_stats_delete AFTER DELETE ON recruit BEGIN
+            UPDATE stats_counter SET count = count - 1,
+                latest = CASE WHEN old.timestamp >= latest THEN (SELECT MAX(timestamp) FROM recruit) ELSE latest END
+                WHERE scope = 'table' AND key = 'recruit';
+            UPDATE stats_counter SET count = count - 1,
+                latest = CASE WHEN old.timestamp >= latest
+                    THEN (SELECT MAX(timestamp) FROM recruit WHERE status IS old.status) ELSE latest END
+                WHERE scope = 'recruit_status' AND key = IFNULL(old.status, 'unknown');
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS recruit_stats_update AFTER UPDATE OF status ON recruit
+        WHEN old.status IS NOT new.status BEGIN
+            UPDATE stats_counter SET count = count - 1,
+                latest = CASE WHEN old.timestamp >= latest
+                    THEN (SELECT MAX(timestamp) FROM recruit WHERE status IS old.status) ELSE latest END
+                WHERE scope = 'recruit_status' AND key = IFNULL(old.status, 'unknown');
+            INSERT INTO stats_counter (scope, key, count, latest) VALUES ('recruit_status', IFNULL(new.status, 'unknown'), 1, new.timestamp)
+                ON CONFLICT (scope, key) DO UPDATE SET count = count + 1,
+                    latest = CASE WHEN latest IS NULL OR excluded.latest > latest THEN excluded.latest ELSE latest END;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS contact_stats_insert AFTER INSERT ON contact BEGIN
+            INSERT INTO stats_counter (scope, key, count, latest) VALUES ('table', 'contact', 1, new.timestamp)
+                ON CONFLICT (scope, key) DO UPDATE SET count = count + 1,
+                    latest = CASE WHEN latest IS NULL OR excluded.latest > latest THEN excluded.latest ELSE latest END;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS contact_stats_delete AFTER DELETE ON contact BEGIN
+            UPDATE stats_counter SET count = count - 1,
+                latest = CASE WHEN old.timestamp >= latest THEN (SELECT MAX(timestamp) FROM contact) ELSE latest END
+                WHERE scope = 'table' AND key = 'contact';
+        END""",
+    ] + REBUILD_COUNTERS),
+    # The rollup records arrivals, so purging old rows does not rewrite activity history
+    (4, 'Add daily and hourly activity rollups', [
+        """CREATE TABLE IF NOT EXISTS activity_rollup (
+            table_name TEXT NOT NULL,
+            granularity TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (table_name, granularity, bucket)
+        ) WITHOUT ROWID""",
+        _rollup_trigger('recruit'),
+        _rollup_trigger('contact'),
+    ] + REBUILD_ROLLUP),
+]
+
+# Tables created by migrations for indexing and bookkeeping rather than holding submissions
+INTERNAL_TABLE_PREFIXES = ('sqlite_', 'recruit_fts', 'contact_fts', 'stats_counter', 'activity_rollup')
+
+# Representative queries from the app and the db_* tools, used for EXPLAIN QUERY PLAN reports
+HOT_QUERIES = [
+    ('admin recruits page', "SELECT * FROM recruit ORDER BY timestamp DESC, id DESC LIMIT 50", ()),
+    ('admin contacts page', "SELECT * FROM contact ORDER BY timestamp DESC, id DESC LIMIT 50", ()),
+    # purge_old_records walks the table by id range, one batch per pair of statements
+    ('purge recruits by age and status: batch range',
+     "SELECT MIN(id), MAX(id) FROM (SELECT id FROM recruit WHERE id > ? AND timestamp < ? AND status = ? ORDER BY id LIMIT ?)",
+     (0, '2000-01-01', 'rejected', 1000)),
+    ('purge recruits by age and status: delete',
+     "DELETE FROM recruit WHERE id BETWEEN ? AND ? AND timestamp < ? AND status = ?",
+     (1, 1000, '2000-01-01', 'rejected')),
+    ('purge contacts by age: batch range',
+     "SELECT MIN(id), MAX(id) FROM (SELECT id FROM contact WHERE id > ? AND timestamp < ? ORDER BY id LIMIT ?)",
+     (0, '2000-01-01', 1000)),
+    ('purge contacts by age: delete',
+     "DELETE FROM contact WHERE id BETWEEN ? AND ? AND timestamp < ?",
+     (1, 1000, '2000-01-01')),
+    ('recruits by status', "SELECT status, COUNT(*) FROM recruit GROUP BY status", ()),
+    ('find recruit by handle', "SELECT * FROM recruit WHERE handle = ?", ('elliot',)),
+    ('recruit activity by day', "SELECT bucket, count FROM activity_rollup WHERE table_name = ? AND granularity = ? AND bucket >= ? AND bucket < ?", ('recruit', 'day', '2025-01-01', '2025-04-01')),
+    ('search recruits', "SELECT rowid FROM recruit_fts WHERE recruit_fts MATCH ? ORDER BY rank LIMIT 50", ('"python"*',)),
+]
+
+
+def get_version(conn):
+    """Return the schema version recorded in the database"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def latest_version():
+    """Return the version the newest migration brings the schema to"""
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def user_tables(conn):
+    """Return the names of tables holding submission data, skipping internal ones"""
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name").fetchall()
+    return [row[0] for row in rows if not row[0].startswith(INTERNAL_TABLE_PREFIXES)]
+
+
+def explain_queries(conn, queries=HOT_QUERIES):
+    """Capture EXPLAIN QUERY PLAN output for each representative query"""
+    plans = {}
+    for label, query, params in queries:
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+            plans[label] = [row[-1] for row in rows]
+        except sqlite3.Error as e:
+            plans[label] = [f"error: {e}"]
+    return plans
+
+
+def print_plans(plans):
+    """Print query plans captured by explain_queries()"""
+    for label, details in plans.items():
+        print(f"  {label}:")
+        for detail in details:
+            print(f"    {detail}")
+
+
+def apply_migration(conn, version, description, statements):
+    """Apply a single migration in its own transaction, returning False if it was already applied"""
+    start_time = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Another process may have migrated between reading the version and taking the lock
+        if get_version(conn) >= version:
+            conn.execute("ROLLBACK")
+            return False
+        for statement in statements:
+            conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {version}")
+        conn.execute("COMMIT")
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+    elapsed = time.time() - start_time
+    print(f"✓ Applied migration {version}: {description} ({elapsed:.2f} seconds)")
+    return True
+
+
+def upgrade(database_path=db_connection.DEFAULT_DATABASE, target=None, explain=False):
+    """Apply all pending migrations up to the target version"""
+    conn = db_connection.connect(database_path, isolation_level=None)
+
+    try:
+        current = get_version(conn)
+        target = latest_version() if target is None else target
+        pending = [m for m in MIGRATIONS if current < m[0] <= target]
+
+        if not pending:
+            return current
+
+        if explain:
+            print("Query plans before migration:")
+            print_plans(explain_queries(conn))
+
+        for version, description, statements in pending:
+            if not apply_migration(conn, version, description, statements):
+                print(f"Migration {version} was already applied by another process")
+
+        if explain:
+            print("Query plans after migration:")
+            print_plans(explain_queries(conn))
+
+        return get_version(conn)
+
+    except sqlite3.Error as e:
+        print(f"✗ Migration failed: {e}")
+        return None
+
+    finally:
+        conn.close()
+
+
+def show_status(database_path=db_connection.DEFAULT_DATABASE):
+    """Print the current schema version and any pending migrations"""
+    conn = db_connection.connect(database_path)
+
+    try:
+        current = get_version(conn)
+        print(f"Schema version: {current} (latest: {latest_version()})")
+        for version, description, _ in MIGRATIONS:
+            state = 'applied' if version <= current else 'pending'
+            print(f"  {version}. {description} [{state}]")
+        return current
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='FSociety Schema Migrations')
+    subparsers = parser.add_subparsers(dest='command', help='Command to run')
+
+    # Status command
+    status_parser = subparsers.add_parser('status', help='Show schema version and pending migrations')
+    status_parser.add_argument('--database', default=db_connection.DEFAULT_DATABASE, help='Database path')
+
+    # Upgrade command
+    upgrade_parser = subparsers.add_parser('upgrade', help='Apply pending migrations')
+    upgrade_parser.add_argument('--database', default=db_connection.DEFAULT_DATABASE, help='Database path')
+    upgrade_parser.add_argument('--target', type=int, help='Stop at this schema version')
+    upgrade_parser.add_argument('--explain', action='store_true', help='Report query plans before and after')
+
+    # Explain command
+    explain_parser = subparsers.add_parser('explain', help='Show query plans for the hot queries')
+    explain_parser.add_argument('--database', default=db_connection.DEFAULT_DATABASE, help='Database path')
+
+    # Parse arguments
+    args = parser.parse_args()
+
+    # Execute command
+    if args.command == 'status':
+        show_status(args.database)
+    elif args.command == 'upgrade':
+        version = upgrade(args.database, args.target, args.explain)
+        if version is not None:
+            print(f"Schema is at version {version}")
+    elif args.command == 'explain':
+        conn = db_connection.connect(args.database)
+        print_plans(explain_queries(conn))
+        conn.close()
+    else:
+        parser.print_help()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# db_pipeline.py - FSociety Maintenance Pipeline
+# Created by Asero
+#
+# Runs several database tools in one process over one shared connection,
+# instead of starting a Python process (and a cold connection) per tool.
+#
+#   py db_pipeline.py "backup,purge:table=recruit;days=30;status=rejected,analyze,stats,export"
+#
+# Steps are separated by commas; options follow a colon as key=value pairs
+# separated by semicolons.
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import db_connection
+import db_backup
+import db_export
+import db_maintenance
+import db_stats
+
+DEFAULT_PIPELINE = 'backup,purge,analyze,stats,export'
+
+# Upper bound for the page cache the warm-up sizes to the database file
+WARM_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+
+def _flag(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+def run_backup(conn, database_path, options):
+    result = db_backup.backup_database(
+        database_path, options.get('dir', 'backups'),
+        pages=int(options.get('pages', db_backup.DEFAULT_BACKUP_PAGES)),
+        sleep=float(options.get('sleep', db_backup.DEFAULT_BACKUP_SLEEP)),
+        store=_flag(options.get('store', False)), conn=conn)
+    return result is not None, result
+
+
+def run_purge(conn, database_path, options):
+    tables = options.get('table', 'recruit+contact').split('+')
+    days = int(options.get('days', 30))
+    batch_size = int(options.get('batch_size', db_maintenance.DEFAULT_PURGE_BATCH))
+    pages = int(options.get('pages', db_maintenance.DEFAULT_VACUUM_PAGE_BUDGET))
+    deleted = 0
+    for table in tables:
+        deleted += db_maintenance.purge_old_records(database_path, table, days, options.get('status'),
+                                                    batch_size, conn=conn, max_pages=pages)
+    return True, f"{deleted:,} rows deleted"
+
+
+def run_analyze(conn, database_path, options):
+    return db_maintenance.analyze_database(database_path, conn=conn), None
+
+
+def run_vacuum(conn, database_path, options):
+    pages = int(options.get('pages', db_maintenance.DEFAULT_VACUUM_PAGE_BUDGET))
+    freed = db_maintenance.incremental_vacuum(database_path, pages, conn=conn)
+    return True, f"{freed:,} pages freed"
+
+
+def run_stats(conn, database_path, options):
+    report = db_stats.generate_text_report(database_path, conn=conn)
+    if _flag(options.get('display', False)):
+        print(report)
+    output_path = db_stats.save_report(report, output_dir=options.get('dir', 'reports'))
+    return True, output_path
+
+
+def run_export(conn, database_path, options):
+    exported = db_export.export_all_tables(
+        database_path, options.get('dir', 'exports'),
+        days=int(options['days']) if 'days' in options else None,
+        compress=_flag(options.get('gzip', False)),
+        incremental=_flag(options.get('incremental', False)), conn=conn)
+    return True, f"{len(exported)} files"
+
+
+def run_size(conn, database_path, options):
+    return db_maintenance.check_database_size(database_path) is not None, None
+
+
+# Step name -> function(conn, database_path, options) returning (ok, detail)
+STEPS = {
+    'backup': run_backup,
+    'purge': run_purge,
+    'analyze': run_analyze,
+    'vacuum': run_vacuum,
+    'stats': run_stats,
+    'export': run_export,
+    'size': run_size,
+}
+
+
+def parse_pipeline(spec):
+    """Parse "step:key=value;key=value,step,..." into a list of (name, options)"""
+    steps = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, option_text = part.partition(':')
+        name = name.strip().lower()
+        if name not in STEPS:
+            raise ValueError(f"Unknown step '{name}' (choose from {', '.join(STEPS)})")
+        options = {}
+        for option in option_text.split(';'):
+            if not option.strip():
+                continue
+            key, sep, value = option.partition('=')
+            if not sep:
+                raise ValueError(f"Option '{option}' of step '{name}' is not key=value")
+            options[key.strip().replace('-', '_')] = value.strip()
+        steps.append((name, options))
+    if not steps:
+        raise ValueError("Pipeline is empty")
+    return steps
+
+
+def warm_connection(conn, database_path):
+    """Size the page cache to the database and read every table through it once"""
+    start = time.perf_counter()
+    size = os.path.getsize(database_path)
+    cache_kib = min(size, WARM_CACHE_MAX_BYTES) // 1024
+    current = conn.execute("PRAGMA cache_size").fetchone()[0]
+    # Negative cache sizes are KiB; only ever grow the cache
+    if current < 0 and cache_kib > -current:
+        conn.execute(f"PRAGMA cache_size=-{cache_kib}")
+
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' AND sql NOT LIKE 'CREATE VIRTUAL%'")]
+    cursor = conn.cursor()
+    for table in tables:
+        cursor.execute(f'SELECT * FROM "{table}"')
+        while cursor.fetchmany(5000):
+            pass
+    cursor.close()
+    return time.perf_counter() - start
+
+
+def run_pipeline(database_path, steps, warm=True, stop_on_error=False):
+    """Run the steps over one connection and return a list of per-step timings"""
+    if not os.path.exists(database_path):
+        print(f"✗ Database not found: {database_path}")
+        return None
+
+    results = []
+    conn = db_connection.connect(database_path)
+    try:
+        if warm:
+            elapsed = warm_connection(conn, database_path)
+            results.append({'step': 'warm', 'ok': True, 'seconds': elapsed, 'detail': None})
+
+        for name, options in steps:
+            print(f"\n=== {name} ===")
+            start = time.perf_counter()
+            try:
+                ok, detail = STEPS[name](conn, database_path, options)
+            except (sqlite3.Error, OSError, ValueError) as e:
+                print(f"✗ Step {name} failed: {e}")
+                ok, detail = False, str(e)
+            # A failed step must not leave the next one inside its transaction
+            if conn.in_transaction:
+                conn.rollback()
+            results.append({'step': name, 'ok': ok, 'seconds': time.perf_counter() - start, 'detail': detail})
+            if not ok and stop_on_error:
+                print("✗ Stopping pipeline after failed step")
+                break
+    finally:
+        conn.close()
+    return results
+
+
+def print_summary(results):
+    """Print a per-step timing table"""
+    total = sum(result['seconds'] for result in results)
+    print("\nPipeline summary")
+    print("-" * 60)
+    for result in results:
+        mark = '✓' if result['ok'] else '✗'
+        detail = f"  {result['detail']}" if result['detail'] else ''
+        share = result['seconds'] / total * 100 if total else 0
+        print(f"{mark} {result['step']:<10} {result['seconds']:>9.3f} s  {share:5.1f}%{detail}")
+    print("-" * 60)
+    print(f"  {'total':<10} {total:>9.3f} s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='FSociety Maintenance Pipeline')
+    parser.add_argument('pipeline', nargs='?', default=DEFAULT_PIPELINE,
+                        help=f'Comma-separated steps with optional key=value options (default: {DEFAULT_PIPELINE})')
+    parser.add_argument('--database', default='instance/fsociety.db', help='Database path')
+    parser.add_argument('--no-warm', action='store_true', help='Skip reading the tables into the page cache first')
+    parser.add_argument('--stop-on-error', action='store_true', help='Stop at the first failed step')
+    parser.add_argument('--list', action='store_true', help='List available steps')
+
+    args = parser.parse_args()
+
+    if args.list:
+        for name in STEPS:
+            print(name)
+        sys.exit(0)
+
+    try:
+        steps = parse_pipeline(args.pipeline)
+    except ValueError as e:
+        print(f"✗ {e}")
+        sys.exit(2)
+
+    results = run_pipeline(args.database, steps, warm=not args.no_warm, stop_on_error=args.stop_on_error)
+    if results is None:
+        sys.exit(1)
+    print_summary(results)
+    sys.exit(0 if all(result['ok'] for result in results) else 1)
@@ -0,0 +1,73 @@
+# db_search.py - FSociety Full-Text Search
+# Created by Asero
+#
+# Queries the FTS5 indexes created by db_migrations.py. Functions take any
+# DB-API connection, so they work from the tools and from inside the app.
+
+import re
+
+RECRUIT_SEARCH_SQL = """
+    SELECT r.id, r.handle, r.skills, r.status, r.timestamp,
+           snippet(recruit_fts, -1, '[', ']', '...', 12) AS snippet,
+           bm25(recruit_fts, 10.0, 4.0, 1.0) AS score
+    FROM recruit_fts
+    JOIN recruit r ON r.id = recruit_fts.rowid
+    WHERE recruit_fts MATCH ?
+    ORDER BY score
+    LIMIT ?
+"""
+
+HANDLE_SEARCH_SQL = """
+    SELECT r.id, r.handle, r.skills, r.status, r.timestamp
+    FROM recruit_fts
+    JOIN recruit r ON r.id = recruit_fts.rowid
+    WHERE recruit_fts MATCH ?
+    ORDER BY rank
+    LIMIT ?
+"""
+
+CONTACT_SEARCH_SQL = """
+    SELECT c.id, c.subject, c.timestamp,
+           snippet(contact_fts, -1, '[', ']', '...', 12) AS snippet,
+           bm25(contact_fts, 5.0, 1.0) AS score
+    FROM contact_fts
+    JOIN contact c ON c.id = contact_fts.rowid
+    WHERE contact_fts MATCH ?
+    ORDER BY score
+    LIMIT ?
+"""
+
+
+def build_match_query(text, column=None):
+    """Turn free text into an FTS5 query matching every word as a prefix, optionally in one column"""
+    terms = re.findall(r'\w+', text or '')
+    prefix = f'{column} : ' if column else ''
+    return ' '.join(f'{prefix}"{term}"*' for term in terms)
+
+
+def _run(conn, sql, text, limit, column=None):
+    match = build_match_query(text, column)
+    if not match:
+        return []
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, (match, limit))
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def search_recruits(conn, text, limit=50):
+    """Search recruit handles, skills and messages, best matches first"""
+    return _run(conn, RECRUIT_SEARCH_SQL, text, limit)
+
+
+def search_contacts(conn, text, limit=50):
+    """Search contact subjects and messages, best matches first"""
+    return _run(conn, CONTACT_SEARCH_SQL, text, limit)
+
+
+def search_handles(conn, text, limit=50):
+    """Search recruit handles only, best matches first"""
+    return _run(conn, HANDLE_SEARCH_SQL, text, limit, column='handle')
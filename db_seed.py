@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# db_seed.py - FSociety Synthetic Data Seeder
+# Created by Asero
+#
+# Fills a database with millions of realistic recruits and contacts so
+# production-sized workloads can be reproduced locally. Rows go in with
+# executemany in large transactions while the secondary indexes and the
+# migration triggers are dropped; afterwards the indexes are rebuilt in one
+# sort each and the FTS, counter and rollup tables are caught up in bulk.
+
+import os
+import time
+import random
+import argparse
+import sqlite3
+from datetime import datetime
+import db_connection
+import db_migrations
+
+DEFAULT_BATCH_SIZE = 200000
+
+# Rows ANALYZE samples per index; enough for the planner and bounded on huge tables
+ANALYSIS_LIMIT = 1000
+
+# Seeding trades durability for speed; a crash mid-seed just means seeding again
+SEED_PRAGMAS = {
+    'synchronous': 'OFF',
+    'cache_size': -262144,
+}
+
+STATUS_WEIGHTS = {'pending': 60, 'approved': 25, 'rejected': 15}
+
+# Relative traffic per hour of day (UTC), quiet overnight and busiest in the evening
+HOUR_WEIGHTS = [3, 2, 1, 1, 1, 1, 2, 3, 5, 6, 7, 7, 8, 8, 8, 8, 9, 10, 12, 14, 15, 13, 9, 5]
+
+USER_AGENTS = [
+    ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36', 40),
+    ('Mozilla/5.0 (X11; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0', 20),
+    ('Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15', 15),
+    ('Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148', 12),
+    ('Mozilla/5.0 (Windows NT 10.0; rv:115.0) Gecko/20100101 Firefox/115.0', 8),
+    ('curl/8.5.0', 3),
+    ('python-requests/2.31.0', 2),
+]
+
+HANDLE_WORDS = ['mr', 'dark', 'zero', 'cipher', 'root', 'ghost', 'phreak', 'byte', 'null', 'shell',
+                'crypt', 'wraith', 'glitch', 'vector', 'packet', 'socket', 'daemon', 'kernel']
+SKILLS = ['python', 'c', 'rust', 'go', 'networking', 'social engineering', 'reverse engineering',
+          'cryptography', 'exploit development', 'linux', 'osint', 'hardware', 'web security', 'forensics']
+MESSAGE_WORDS = ['evil', 'corp', 'control', 'system', 'debt', 'freedom', 'we', 'are', 'fsociety', 'join',
+                 'revolution', 'illusion', 'power', 'network', 'exploit', 'root', 'access', 'world',
+                 'change', 'everything', 'is', 'a', 'lie', 'wake', 'up', 'the', 'data', 'free']
+SUBJECTS = ['Question', 'Want to help', 'Tip', 'Leak', 'Press inquiry', 'Collaboration', 'Report', 'Hello']
+
+# Timestamps are bound last so a pooled row template plus a timestamp is a whole row
+RECRUIT_INSERT = """INSERT INTO recruit (handle, skills, message, passphrase, ip_address, user_agent, status, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+
+CONTACT_INSERT = """INSERT INTO contact (subject, message, pgp_key, ip_address, timestamp)
+    VALUES (?, ?, ?, ?, ?)"""
+
+# Catch the derived tables up with rows above an id watermark, mirroring what the
+# migration triggers would have done row by row
+CATCH_UP = {
+    'recruit': [
+        "INSERT INTO recruit_fts (rowid, handle, skills, message) SELECT id, handle, skills, message FROM recruit WHERE id > ?",
+    ],
+    'contact': [
+        "INSERT INTO contact_fts (rowid, subject, message) SELECT id, subject, message FROM contact WHERE id > ?",
+    ],
+}
+
+ROLLUP_CATCH_UP = """INSERT INTO activity_rollup (table_name, granularity, bucket, count)
+    SELECT '{table}', '{granularity}', strftime('{bucket_format}', timestamp) AS bucket, COUNT(*)
+    FROM {table} WHERE id > ? AND timestamp IS NOT NULL GROUP BY bucket
+    ON CONFLICT (table_name, granularity, bucket) DO UPDATE SET count = count + excluded.count"""
+
+
+class Generator:
+    """Builds batches of synthetic rows by sampling precomputed pools.
+
+    Rows are a pooled template (every column but the timestamp) plus a
+    pooled timestamp, so a batch costs two random.choices calls instead of
+    formatting every value per row.
+    """
+
+    def __init__(self, days=365, skew=2.0, seed=None, pool_size=100000):
+        self.rng = random.Random(seed)
+        rng = self.rng
+
+        handles = [f"{rng.choice(HANDLE_WORDS)}{rng.choice(['_', '', '.'])}{rng.choice(HANDLE_WORDS)}{rng.randint(0, 9999)}"
+                   for _ in range(pool_size // 2)]
+        skills = [', '.join(rng.sample(SKILLS, rng.randint(1, 4))) for _ in range(2000)]
+        messages = [' '.join(rng.choices(MESSAGE_WORDS, k=rng.randint(6, 40))).capitalize() + '.'
+                    for _ in range(5000)]
+        subjects = [f"{rng.choice(SUBJECTS)} {rng.choice(MESSAGE_WORDS)}" for _ in range(500)]
+        ips = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+               for _ in range(pool_size)]
+
+        self.recruit_pool = list(zip(
+            rng.choices(handles, k=pool_size),
+            rng.choices(skills, k=pool_size),
+            rng.choices(messages, k=pool_size),
+            rng.choices(['debt', 'evil corp', 'the system'], k=pool_size),
+            rng.choices(ips, k=pool_size),
+            rng.choices([ua for ua, _ in USER_AGENTS], weights=[w for _, w in USER_AGENTS], k=pool_size),
+            rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()), k=pool_size),
+        ))
+        self.contact_pool = list(zip(
+            rng.choices(subjects, k=pool_size),
+            rng.choices(messages, k=pool_size),
+            [None] * pool_size,
+            rng.choices(ips, k=pool_size),
+        ))
+        self.timestamp_pool = self.timestamps(pool_size * 10, days, skew)
+
+    def timestamps(self, count, days, skew):
+        """Formatted UTC timestamps skewed towards recent days and busy hours"""
+        rng = self.rng
+        now = time.time()
+        today = now - now % 86400
+        hours = rng.choices(range(24), weights=HOUR_WEIGHTS, k=count)
+        stamps = []
+        for hour in hours:
+            moment = today - int(days * rng.random() ** skew) * 86400 + (hour + rng.random()) * 3600
+            if moment > now:
+                moment -= 86400
+            # Same text format SQLAlchemy writes for DateTime columns
+            stamps.append(datetime.utcfromtimestamp(moment).isoformat(' ', 'microseconds'))
+        return stamps
+
+    def _rows(self, pool, count):
+        rng = self.rng
+        return [template + (stamp,) for template, stamp in
+                zip(rng.choices(pool, k=count), rng.choices(self.timestamp_pool, k=count))]
+
+    def recruits(self, count):
+        return self._rows(self.recruit_pool, count)
+
+    def contacts(self, count):
+        return self._rows(self.contact_pool, count)
+
+
+def ensure_schema(database_path):
+    """Create the tables and apply migrations if the database is new"""
+    conn = sqlite3.connect(database_path)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    conn.close()
+
+    if not {'recruit', 'contact'} <= tables:
+        # The ORM models are the source of truth for the base tables
+        from sqlalchemy import create_engine
+        from models import db
+        engine = create_engine(f"sqlite:///{os.path.abspath(database_path)}")
+        db.metadata.create_all(engine)
+        engine.dispose()
+
+    db_migrations.upgrade(database_path)
+
+
+def drop_deferred(conn, tables):
+    """Drop secondary indexes and triggers on the tables, returning their SQL"""
+    placeholders = ','.join('?' for _ in tables)
+    rows = conn.execute(
+        f"SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') "
+        f"AND tbl_name IN ({placeholders}) AND sql IS NOT NULL",
+        tables
+    ).fetchall()
+    for object_type, name, _ in rows:
+        conn.execute(f"DROP {object_type.upper()} {name}")
+    return [sql for _, _, sql in rows]
+
+
+def catch_up(conn, table, watermark, search=True):
+    """Bring FTS, counters and rollups up to date with rows above the watermark"""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+    if search and f"{table}_fts" in tables:
+        for statement in CATCH_UP[table]:
+            conn.execute(statement, (watermark,))
+
+    if 'activity_rollup' in tables:
+        for granularity, bucket_format in (('day', '%Y-%m-%d'), ('hour', '%Y-%m-%d %H:00')):
+            conn.execute(ROLLUP_CATCH_UP.format(table=table, granularity=granularity, bucket_format=bucket_format),
+                         (watermark,))
+
+
+def rebuild_deferred(conn, deferred, watermarks, search=True):
+    """Recreate deferred indexes and triggers and catch up the derived tables"""
+    start_time = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    for sql in deferred:
+        conn.execute(sql)
+    for table, watermark in watermarks.items():
+        catch_up(conn, table, watermark, search)
+    if 'stats_counter' in {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}:
+        for statement in db_migrations.REBUILD_COUNTERS:
+            conn.execute(statement)
+    conn.execute("COMMIT")
+    print(f"✓ Rebuilt indexes{', search' if search else ''} and counters in {time.time() - start_time:.2f} seconds")
+
+
+def build_search_index(database_path=db_connection.DEFAULT_DATABASE):
+    """Rebuild the full-text search tables from their content tables"""
+    conn = db_connection.connect(database_path, pragmas=SEED_PRAGMAS, isolation_level=None)
+    try:
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name IN ('recruit_fts', 'contact_fts')")]
+        for table in tables:
+            start_time = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
+            conn.execute("COMMIT")
+            print(f"✓ Rebuilt {table} in {time.time() - start_time:.2f} seconds")
+    finally:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        conn.close()
+    return tables
+
+
+def seed_database(database_path=db_connection.DEFAULT_DATABASE, recruits=100000, contacts=25000,
+                  days=365, seed=None, batch_size=DEFAULT_BATCH_SIZE, defer_indexes=None, defer_search=False):
+    """Bulk-insert synthetic recruits and contacts, returning the rows added per table.
+
+    Indexes and triggers are deferred when the seed at least doubles the
+    tables (or defer_indexes is True); rebuilding them is a pass over every
+    row, which only pays off for large loads. With defer_search the FTS
+    tables are not caught up at all, leaving build_search_index to run later;
+    it only applies while the triggers are deferred.
+    """
+    ensure_schema(database_path)
+    generator = Generator(days=days, seed=seed, pool_size=max(1000, min(100000, recruits + contacts)))
+    conn = db_connection.connect(database_path, pragmas=SEED_PRAGMAS, isolation_level=None)
+    start_time = time.time()
+    plan = [('recruit', recruits, RECRUIT_INSERT, generator.recruits),
+            ('contact', contacts, CONTACT_INSERT, generator.contacts)]
+
+    watermarks = {table: conn.execute(f"SELECT IFNULL(MAX(id), 0) FROM {table}").fetchone()[0]
+                  for table, _, _, _ in plan}
+
+    if defer_indexes is None:
+        existing = sum(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in watermarks)
+        defer_indexes = recruits + contacts >= existing
+
+    deferred = []
+    if defer_indexes:
+        conn.execute("BEGIN IMMEDIATE")
+        deferred = drop_deferred(conn, list(watermarks))
+        conn.execute("COMMIT")
+        print(f"Deferred {len(deferred)} indexes and triggers")
+
+    try:
+        for table, count, insert_sql, make_rows in plan:
+            table_start = time.time()
+            for offset in range(0, count, batch_size):
+                rows = make_rows(min(batch_size, count - offset))
+                conn.execute("BEGIN")
+                conn.executemany(insert_sql, rows)
+                conn.execute("COMMIT")
+            elapsed = time.time() - table_start
+            rate = count / elapsed if elapsed else 0
+            print(f"✓ Inserted {count:,} {table} rows in {elapsed:.2f} seconds ({rate:,.0f} rows/s)")
+
+    finally:
+        # Runs after a failed batch too, so committed rows are never left unindexed
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        if deferred:
+            rebuild_deferred(conn, deferred, watermarks, search=not defer_search)
+        conn.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+        conn.execute("ANALYZE")
+        conn.close()
+
+    total = recruits + contacts
+    elapsed = time.time() - start_time
+    print(f"✓ Seeded {total:,} rows in {elapsed:.2f} seconds ({total / elapsed:,.0f} rows/s)")
+    if deferred and defer_search:
+        print(f"Search index not built; run: python db_seed.py --db {database_path} --build-search")
+    return {'recruit': recruits, 'contact': contacts}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='FSociety Synthetic Data Seeder')
+    parser.add_argument('--db', default=db_connection.DEFAULT_DATABASE, help='Path to the database file')
+    parser.add_argument('--recruits', type=int, default=100000, help='Recruit rows to generate')
+    parser.add_argument('--contacts', type=int, default=25000, help='Contact rows to generate')
+    parser.add_argument('--days', type=int, default=365, help='Spread timestamps over the last X days')
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible data')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows per transaction')
+    parser.add_argument('--defer-indexes', dest='defer_indexes', action='store_true', default=None,
+                        help='Always drop indexes and triggers during the load')
+    parser.add_argument('--keep-indexes', dest='defer_indexes', action='store_false',
+                        help='Never drop indexes and triggers during the load')
+    parser.add_argument('--defer-search', action='store_true',
+                        help='Leave the full-text search index for a later --build-search run')
+    parser.add_argument('--build-search', action='store_true',
+                        help='Only rebuild the full-text search index and exit')
+
+    args = parser.parse_args()
+    if args.build_search:
+        build_search_index(args.db)
+    else:
+        seed_database(args.db, args.recruits, args.contacts, args.days, args.seed, args.batch_size,
+                      args.defer_indexes, args.defer_search)
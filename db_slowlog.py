@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# db_slowlog.py - FSociety Slow-Query Log
+# Created by Asero
+#
+# Records every SQL statement slower than a threshold, with its parameters,
+# duration, caller and EXPLAIN QUERY PLAN, as JSON lines in a rotating log.
+# The web app hooks the SQLAlchemy engine; the db_* tools get a tracing
+# sqlite3 connection from db_connection.connect().
+#
+#   FSOCIETY_SLOW_QUERY_MS   threshold in milliseconds (default 200, "off" disables)
+#   FSOCIETY_SLOW_QUERY_LOG  log file (default logs/slow_queries.jsonl)
+
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import weakref
+from datetime import datetime
+
+DEFAULT_THRESHOLD_MS = 200
+DEFAULT_LOG_FILE = 'logs/slow_queries.jsonl'
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 5
+
+# Long parameter values are cut so one bulk insert can't flood the log
+MAX_PARAM_LENGTH = 200
+
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH')
+
+# Frames from these modules are skipped when looking for the code that issued a statement
+INTERNAL_MODULES = ('sqlalchemy', 'flask_sqlalchemy', 'db_slowlog', 'sqlite3')
+
+_loggers = {}
+_factories = {}
+
+# Engines init_app has already hooked
+_engines = weakref.WeakSet()
+
+
+def threshold_ms(value=None):
+    """Resolve the threshold from an explicit value or the environment, None if disabled"""
+    if value is None:
+        value = os.environ.get('FSOCIETY_SLOW_QUERY_MS', DEFAULT_THRESHOLD_MS)
+    if isinstance(value, str):
+        if value.strip().lower() in ('', 'off', 'none', 'false'):
+            return None
+        value = float(value)
+    return value
+
+
+def log_path():
+    return os.environ.get('FSOCIETY_SLOW_QUERY_LOG', DEFAULT_LOG_FILE)
+
+
+def get_logger(path=None):
+    """Return a JSON-lines logger writing to a rotating file"""
+    # Imported here so tools that never log a slow statement don't load logging
+    import logging
+    from logging.handlers import RotatingFileHandler
+
+    path = path or log_path()
+    logger = _loggers.get(path)
+    if logger is None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        logger = logging.getLogger(f'fsociety.slowlog.{path}')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        _loggers[path] = logger
+    return logger
+
+
+def _short(value):
+    if isinstance(value, bytes):
+        return f'<{len(value)} bytes>'
+    if isinstance(value, str) and len(value) > MAX_PARAM_LENGTH:
+        return value[:MAX_PARAM_LENGTH] + '...'
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    return str(value)
+
+
+def _params(parameters):
+    if isinstance(parameters, dict):
+        return {key: _short(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_short(value) for value in parameters]
+    return parameters
+
+
+def _caller():
+    """Describe the innermost stack frame outside the database layers"""
+    import traceback
+
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        module = os.path.splitext(os.path.basename(frame.filename))[0]
+        if module not in INTERNAL_MODULES and f'{os.sep}sqlalchemy{os.sep}' not in frame.filename:
+            return f"{os.path.basename(frame.filename)}:{frame.lineno} in {frame.name}"
+    return None
+
+
+def explain(conn, statement, parameters):
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement, if it has a plan"""
+    if not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    try:
+        # A plain cursor so a tracing connection doesn't trace its own EXPLAIN
+        cursor = sqlite3.Cursor(conn)
+        try:
+            rows = cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+        finally:
+            cursor.close()
+        return [row[-1] for row in rows]
+    except sqlite3.Error as e:
+        return [f"error: {e}"]
+
+
+def record(conn, statement, parameters, duration, source, executemany=False, path=None):
+    """Write one slow statement to the log"""
+    rows = None
+    if executemany:
+        parameters = list(parameters) if parameters is not None else []
+        rows = len(parameters)
+        parameters = parameters[0] if parameters else None
+
+    entry = {
+        'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'duration_ms': round(duration * 1000, 3),
+        'source': source,
+        'program': os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else None,
+        'caller': _caller(),
+        'statement': ' '.join(statement.split()),
+        'parameters': _params(parameters),
+        'rows': rows,
+        'plan': explain(conn, statement, parameters),
+    }
+    get_logger(path).info(json.dumps(entry, default=str))
+
+
+class TracingCursor(sqlite3.Cursor):
+    """sqlite3 cursor that logs statements slower than the threshold"""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        result = super().execute(sql, parameters)
+        duration = time.perf_counter() - start
+        if duration * 1000 >= self.connection.slow_query_ms:
+            record(self.connection, sql, parameters, duration, 'sqlite3')
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        # Materialized so the first row can still be logged after the generator is consumed
+        seq_of_parameters = seq_of_parameters if isinstance(seq_of_parameters, (list, tuple)) else list(seq_of_parameters)
+        start = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        duration = time.perf_counter() - start
+        if duration * 1000 >= self.connection.slow_query_ms:
+            record(self.connection, sql, seq_of_parameters, duration, 'sqlite3', executemany=True)
+        return result
+
+
+class TracingConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors (including conn.execute) are traced"""
+
+    slow_query_ms = DEFAULT_THRESHOLD_MS
+
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory(threshold=None):
+    """Return a sqlite3 connection factory tracing at the threshold, or None if disabled"""
+    threshold = threshold_ms(threshold)
+    if threshold is None:
+        return None
+    factory = _factories.get(threshold)
+    if factory is None:
+        factory = _factories[threshold] = type('TracingConnection', (TracingConnection,), {'slow_query_ms': threshold})
+    return factory
+
+
+def init_app(app):
+    """Log slow statements issued through the app's SQLAlchemy engine.
+
+    Call after db.init_app(app). The listeners go on the app's own engine
+    rather than the Engine class, so other apps and engines in the process
+    are not traced, and calling this again for the same engine does nothing.
+    """
+    from sqlalchemy import event
+
+    threshold = app.config.get('SLOW_QUERY_MS', threshold_ms())
+    if threshold is None:
+        return
+    path = app.config.get('SLOW_QUERY_LOG') or log_path()
+
+    with app.app_context():
+        engine = app.extensions['sqlalchemy'].db.engine
+    if engine in _engines:
+        return
+    _engines.add(engine)
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info['slowlog_start'] = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def log_slow_statement(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop('slowlog_start', None)
+        if start is None:
+            return
+        duration = time.perf_counter() - start
+        if duration * 1000 >= threshold and isinstance(cursor.connection, sqlite3.Connection):
+            record(cursor.connection, statement, parameters, duration, 'orm', executemany, path)
+
+
+def read_entries(path=None):
+    """Yield log entries from the current log and its rotated files, oldest first"""
+    path = path or log_path()
+    files = [f"{path}.{n}" for n in range(LOG_BACKUPS, 0, -1)] + [path]
+    for file_path in files:
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, 'r') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def summarize(entries, sort='total'):
+    """Group entries by statement text, returning per-statement totals sorted by `sort`"""
+    groups = {}
+    for entry in entries:
+        # Literal numbers are folded so f-string built statements group together
+        key = re.sub(r'\b\d+(\.\d+)?\b', '?', entry['statement'])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {'statement': key, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                   'callers': set(), 'last': entry}
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        if entry.get('caller'):
+            group['callers'].add(entry['caller'])
+        group['last'] = entry
+
+    sort_key = {'total': 'total_ms', 'max': 'max_ms', 'count': 'count'}[sort]
+    return sorted(groups.values(), key=lambda g: g[sort_key], reverse=True)
+
+
+def print_report(path=None, top=10, sort='total'):
+    """Print the statements that spent the most time over the threshold"""
+    groups = summarize(read_entries(path), sort)
+    if not groups:
+        print(f"No slow queries logged in {path or log_path()}")
+        return
+
+    print(f"Top {min(top, len(groups))} of {len(groups)} slow statements (by {sort}):")
+    for rank, group in enumerate(groups[:top], 1):
+        avg = group['total_ms'] / group['count']
+        print(f"\n{rank}. {group['count']}x  total {group['total_ms']:.1f} ms  "
+              f"avg {avg:.1f} ms  max {group['max_ms']:.1f} ms")
+        print(f"   {group['statement'][:300]}")
+        for caller in sorted(group['callers'])[:3]:
+            print(f"   from {caller}")
+        last = group['last']
+        batch = f", {last['rows']} rows" if last.get('rows') else ''
+        print(f"   last: {last['time']} ({last['source']}{batch}) params {json.dumps(last['parameters'], default=str)[:200]}")
+        for detail in last.get('plan') or []:
+            print(f"     {detail}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='FSociety Slow-Query Log')
+    subparsers = parser.add_subparsers(dest='command', help='Command to run')
+
+    report_parser = subparsers.add_parser('report', help='List the slowest statements')
+    report_parser.add_argument('--top', type=int, default=10, help='Number of statements to show')
+    report_parser.add_argument('--sort', choices=['total', 'max', 'count'], default='total', help='Ranking order')
+    report_parser.add_argument('--log', default=None, help='Log file (default: FSOCIETY_SLOW_QUERY_LOG or logs/slow_queries.jsonl)')
+
+    args = parser.parse_args()
+
+    if args.command == 'report':
+        print_report(args.log, args.top, args.sort)
+    else:
+        parser.print_help()
@@ -4,24 +4,105 @@
 
 import os
 import sqlite3
+import db_connection
+import db_migrations
 import argparse
 from datetime import datetime, timedelta
 import json
 
-def get_basic_stats(database_path):
+def read_counters(conn):
+    """Read the trigger-maintained counters as {(scope, key): (count, latest)}
+
+    Returns an empty dict for databases that predate the counters migration.
+    """
+    try:
+        rows = conn.execute("SELECT scope, key, count, latest FROM stats_counter").fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    return {(row[0], row[1]): (row[2], row[3]) for row in rows}
+
+GRANULARITIES = ('hour', 'day', 'month')
+BUCKET_FORMATS = {'hour': '%Y-%m-%d %H:00', 'day': '%Y-%m-%d'}
+
+def read_activity(conn, table, start=None, end=None, granularity='day'):
+    """Read submission counts per time bucket for start <= bucket < end
+
+    Reads the activity_rollup primary key range; databases without the
+    rollup fall back to an index range scan on timestamp. Month buckets
+    are summed from the daily rollup.
+    """
+    source = 'day' if granularity == 'month' else granularity
+    params = []
+    
+    try:
+        query = "SELECT bucket, count FROM activity_rollup WHERE table_name = ? AND granularity = ?"
+        params = [table, source]
+        if start:
+            query += " AND bucket >= ?"
+            params.append(start)
+        if end:
+            query += " AND bucket < ?"
+            params.append(end)
+        rows = conn.execute(query + " ORDER BY bucket", params).fetchall()
+    except sqlite3.OperationalError:
+        # Compare the bare column so the timestamp index can be used
+        query = f"SELECT strftime('{BUCKET_FORMATS[source]}', timestamp) AS bucket, COUNT(*) FROM {table} WHERE timestamp IS NOT NULL"
+        params = []
+        if start:
+            query += " AND timestamp >= ?"
+            params.append(start)
+        if end:
+            query += " AND timestamp < ?"
+            params.append(end)
+        rows = conn.execute(query + " GROUP BY bucket ORDER BY bucket", params).fetchall()
+    
+    counts = {}
+    for bucket, count in rows:
+        if granularity == 'month':
+            bucket = bucket[:7]
+        counts[bucket] = counts.get(bucket, 0) + count
+    return counts
+
+def get_activity(database_path, start=None, end=None, granularity='day', tables=('recruit', 'contact')):
+    """Get submission activity per time bucket for each table
+
+    start and end are 'YYYY-MM-DD' dates; both are inclusive.
+    """
+    end_exclusive = None
+    if end:
+        end_exclusive = (datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    
+    try:
+        conn = db_connection.connect(database_path)
+        return {table: read_activity(conn, table, start, end_exclusive, granularity) for table in tables}
+    
+    except sqlite3.Error as e:
+        print(f"Error getting activity: {e}")
+        return None
+    
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+def get_basic_stats(database_path, conn=None):
     """Get basic statistics about the database"""
+    owned = conn is None
     try:
-        conn = sqlite3.connect(database_path)
+        if owned:
+            conn = db_connection.connect(database_path)
         cursor = conn.cursor()
         
-        # Get table counts
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = [row[0] for row in cursor.fetchall()]
+        # Get table counts from the counters, only scanning tables that have none
+        tables = db_migrations.user_tables(conn)
+        counters = read_counters(conn)
         
         table_counts = {}
         for table in tables:
-            cursor.execute(f"SELECT COUNT(*) FROM {table}")
-            count = cursor.fetchone()[0]
+            if ('table', table) in counters:
+                count = counters[('table', table)][0]
+            else:
+                cursor.execute(f"SELECT COUNT(*) FROM {table}")
+                count = cursor.fetchone()[0]
             table_counts[table] = count
         
         # Get database file size
@@ -49,38 +130,39 @@ def get_basic_stats(database_path):
         return None
     
     finally:
-        if 'conn' in locals():
+        if owned and conn is not None:
             conn.close()
 
-def get_detailed_stats(database_path):
+def get_detailed_stats(database_path, conn=None):
     """Get more detailed statistics about records in the database"""
+    owned = conn is None
     try:
-        conn = sqlite3.connect(database_path)
-        conn.row_factory = sqlite3.Row  # This enables column access by name
+        if owned:
+            conn = db_connection.connect(database_path)
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row  # Column access by name, without changing a shared connection
         
         stats = {}
+        counters = read_counters(conn)
         
         # Recruits statistics
         try:
             # Total recruits by status
-            cursor.execute("SELECT status, COUNT(*) as count FROM recruit GROUP BY status")
-            status_counts = {row['status']: row['count'] for row in cursor.fetchall()}
+            if counters:
+                status_counts = {key: count for (scope, key), (count, _) in counters.items()
+                                 if scope == 'recruit_status' and count > 0}
+            else:
+                cursor.execute("SELECT status, COUNT(*) as count FROM recruit GROUP BY status")
+                status_counts = {row['status']: row['count'] for row in cursor.fetchall()}
             
             # Recruits per day (last 7 days)
             one_week_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-            cursor.execute(f"""
-                SELECT date(timestamp) as day, COUNT(*) as count 
-                FROM recruit 
-                WHERE date(timestamp) >= '{one_week_ago}'
-                GROUP BY date(timestamp)
-                ORDER BY day
-            """)
-            daily_counts = {row['day']: row['count'] for row in cursor.fetchall()}
+            daily_counts = read_activity(conn, 'recruit', one_week_ago, None, 'day')
             
             stats['recruits'] = {
                 "total": sum(status_counts.values()) if status_counts else 0,
                 "by_status": status_counts,
+                "latest": counters.get(('table', 'recruit'), (0, None))[1],
                 "daily_last_week": daily_counts
             }
         except sqlite3.Error as e:
@@ -89,8 +171,11 @@ def get_detailed_stats(database_path):
         # Contact messages statistics
         try:
             # Total messages
-            cursor.execute("SELECT COUNT(*) as count FROM contact")
-            total_messages = cursor.fetchone()['count']
+            if ('table', 'contact') in counters:
+                total_messages = counters[('table', 'contact')][0]
+            else:
+                cursor.execute("SELECT COUNT(*) as count FROM contact")
+                total_messages = cursor.fetchone()['count']
             
             # Messages by domain (from email)
             cursor.execute("""
@@ -102,6 +187,7 @@ def get_detailed_stats(database_path):
             
             stats['contacts'] = {
                 "total": total_messages,
+                "latest": counters.get(('table', 'contact'), (0, None))[1],
                 "last_30_days": recent_messages
             }
         except sqlite3.Error as e:
@@ -114,13 +200,13 @@ def get_detailed_stats(database_path):
         return None
     
     finally:
-        if 'conn' in locals():
+        if owned and conn is not None:
             conn.close()
 
-def generate_text_report(database_path):
+def generate_text_report(database_path, activity=None, granularity='day', conn=None):
     """Generate a text-based report of database statistics"""
-    basic_stats = get_basic_stats(database_path)
-    detailed_stats = get_detailed_stats(database_path)
+    basic_stats = get_basic_stats(database_path, conn=conn)
+    detailed_stats = get_detailed_stats(database_path, conn=conn)
     
     if not basic_stats:
         return "Failed to get database statistics"
@@ -149,6 +235,8 @@ def generate_text_report(database_path):
         
         if 'error' not in recruit_stats:
             report.append(f"Total recruits: {recruit_stats['total']:,}")
+            if recruit_stats.get('latest'):
+                report.append(f"Latest application: {recruit_stats['latest']}")
             
             report.append("\nRecruits by status:")
             for status, count in recruit_stats.get('by_status', {}).items():
@@ -164,8 +252,17 @@ def generate_text_report(database_path):
         
         if 'error' not in contact_stats:
             report.append(f"Total contact messages: {contact_stats['total']:,}")
+            if contact_stats.get('latest'):
+                report.append(f"Latest message: {contact_stats['latest']}")
             report.append(f"Messages in last 30 days: {contact_stats['last_30_days']:,}")
     
+    if activity:
+        report.append(f"\n[ACTIVITY BY {granularity.upper()}]")
+        for table, counts in activity.items():
+            report.append(f"\n{table} ({sum(counts.values()):,} total):")
+            for bucket, count in counts.items():
+                report.append(f"  - {bucket}: {count:,}")
+    
     report.append("\n" + "=" * 60)
     report.append(" " * 20 + "END OF REPORT")
     report.append("=" * 60)
@@ -201,9 +298,17 @@ if __name__ == '__main__':
     parser.add_argument('--format', choices=['txt', 'json'], default='txt', help='Output format')
     parser.add_argument('--output-dir', default='reports', help='Output directory for reports')
     parser.add_argument('--display', action='store_true', help='Display report on screen')
+    parser.add_argument('--from', dest='start', help='Include activity from this date (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='end', help='Include activity up to and including this date (YYYY-MM-DD)')
+    parser.add_argument('--granularity', choices=GRANULARITIES, default='day', help='Activity bucket size')
     
     args = parser.parse_args()
     
+    # Activity comes from the rollup table, so long ranges stay cheap
+    activity = None
+    if args.start or args.end:
+        activity = get_activity(args.database, args.start, args.end, args.granularity)
+    
     if args.format == 'json':
         basic_stats = get_basic_stats(args.database)
         detailed_stats = get_detailed_stats(args.database)
@@ -212,13 +317,15 @@ if __name__ == '__main__':
             "basic_stats": basic_stats,
             "detailed_stats": detailed_stats
         }
+        if activity is not None:
+            report["activity"] = {"granularity": args.granularity, "from": args.start, "to": args.end, **activity}
         
         if args.display:
             print(json.dumps(report, indent=2))
         
         save_report(report, output_format='json', output_dir=args.output_dir)
     else:
-        report = generate_text_report(args.database)
+        report = generate_text_report(args.database, activity, args.granularity)
         
         if args.display:
             print(report)
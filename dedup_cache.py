@@ -0,0 +1,139 @@
+# dedup_cache.py - FSociety duplicate-submission cache
+# Created by Asero
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import local_store
+
+DEFAULT_WINDOW_SECONDS = 60
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def submission_key(route, fields, remote_addr):
+    """Hash a route, its form field values and the client address into a cache key"""
+    digest = hashlib.blake2b(digest_size=16)
+    for value in (route, remote_addr, *fields):
+        # Length-prefixed so ("ab", "c") and ("a", "bc") hash differently
+        data = (value or '').encode('utf-8')
+        digest.update(len(data).to_bytes(4, 'big'))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class MemoryBackend:
+    """Keys and expiry times in an insertion-ordered dict, for a single process"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def claim(self, key, now, window):
+        with self.lock:
+            expires = self.entries.get(key)
+            if expires is not None and expires > now:
+                return False
+            self.entries[key] = now + window
+            self.entries.move_to_end(key)
+            # The window is fixed, so the oldest entries expire first
+            while self.entries:
+                oldest = next(iter(self.entries.values()))
+                if oldest > now and len(self.entries) <= self.max_entries:
+                    break
+                self.entries.popitem(last=False)
+            return True
+
+    def forget(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class SQLiteBackend(local_store.LocalStore):
+    """Keys in a small SQLite file shared by every worker process on the host"""
+
+    def __init__(self, path, max_entries):
+        super().__init__(path, [
+            "CREATE TABLE IF NOT EXISTS dedup (key TEXT PRIMARY KEY, expires REAL NOT NULL) WITHOUT ROWID",
+            "CREATE INDEX IF NOT EXISTS ix_dedup_expires ON dedup (expires)",
+        ])
+        self.max_entries = max_entries
+
+    def claim(self, key, now, window):
+        conn = self.connection()
+        # One statement claims the key unless an unexpired claim already holds it
+        cursor = conn.execute(
+            "INSERT INTO dedup (key, expires) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET expires = excluded.expires WHERE dedup.expires <= ?",
+            (key, now + window, now))
+        claimed = cursor.rowcount == 1
+        if self.due_for_prune():
+            self.prune(conn, now)
+        return claimed
+
+    def prune(self, conn, now):
+        conn.execute("DELETE FROM dedup WHERE expires <= ?", (now,))
+        excess = conn.execute("SELECT COUNT(*) FROM dedup").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute("DELETE FROM dedup WHERE key IN (SELECT key FROM dedup ORDER BY expires LIMIT ?)", (excess,))
+
+    def forget(self, key):
+        self.connection().execute("DELETE FROM dedup WHERE key = ?", (key,))
+
+
+class DedupCache:
+    """Drop repeated form submissions before they reach the database.
+
+    A submission is claimed by hashing its fields and the client address;
+    the same claim within DEDUP_WINDOW_SECONDS is a duplicate. The memory
+    backend serves one process, DEDUP_BACKEND = 'sqlite' shares claims
+    between gunicorn workers through a local file.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.backend = local_store.LazyBackend(self._create_backend)
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def _create_backend(self):
+        config = self.app.config
+        max_entries = config.get('DEDUP_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+        if config.get('DEDUP_BACKEND', 'memory') == 'sqlite':
+            path = config.get('DEDUP_SQLITE_PATH') or os.path.join(self.app.instance_path, 'dedup_cache.db')
+            return SQLiteBackend(path, max_entries)
+        return MemoryBackend(max_entries)
+
+    def _count(self, route, hit):
+        with self.lock:
+            counts = self.counts.setdefault(route, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def claim(self, route, fields, remote_addr):
+        """Return the submission's key, or None if it repeats one inside the window"""
+        key = submission_key(route, fields, remote_addr)
+        if not self.app.config.get('DEDUP_ENABLED', True):
+            return key
+        window = self.app.config.get('DEDUP_WINDOW_SECONDS', DEFAULT_WINDOW_SECONDS)
+        claimed = self.backend.get().claim(key, time.time(), window)
+        self._count(route, not claimed)
+        return key if claimed else None
+
+    def forget(self, key):
+        """Release a claim whose write failed, so a retry is not taken for a duplicate"""
+        if self.backend.value is not None:
+            self.backend.value.forget(key)
+
+    def render_metrics(self):
+        """Return hit/miss counters in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            counts = sorted(self.counts.items())
+        for name, index, help_text in (('hits', 0, 'Submissions dropped as duplicates'),
+                                       ('misses', 1, 'Submissions checked and let through')):
+            metric = f'fsociety_dedup_{name}_total'
+            lines.extend([f'# HELP {metric} {help_text}', f'# TYPE {metric} counter'])
+            lines.extend(f'{metric}{{route="{route}"}} {values[index]}' for route, values in counts)
+        return lines
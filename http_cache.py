@@ -0,0 +1,63 @@
+# http_cache.py - FSociety HTTP response cache
+# Created by Asero
+
+import hashlib
+import threading
+from datetime import datetime, timezone
+from functools import wraps
+from flask import Response, request, make_response
+
+
+class CachedPage:
+    """A rendered response body with its validators"""
+
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+class PageCache:
+    """In-process cache for GET responses that never change between deploys.
+
+    The first GET renders the view and keeps the body; later requests are
+    served from memory with ETag/Last-Modified validators, and clients that
+    already hold the current version get an empty 304.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.pages = {}
+        self.lock = threading.Lock()
+
+    def cached(self, max_age=300):
+        """Decorate a view whose GET output only depends on the endpoint"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method not in ('GET', 'HEAD') or not self.app.config.get('PAGE_CACHE_ENABLED', True):
+                    return view(*args, **kwargs)
+
+                page = self.pages.get(request.endpoint)
+                if page is None:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    page = CachedPage(response.get_data(), response.mimetype)
+                    with self.lock:
+                        page = self.pages.setdefault(request.endpoint, page)
+
+                response = Response(page.body, mimetype=page.mimetype)
+                response.set_etag(page.etag)
+                response.last_modified = page.last_modified
+                response.cache_control.public = True
+                response.cache_control.max_age = max_age
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
+
+    def clear(self):
+        """Drop every cached page, e.g. after templates change"""
+        with self.lock:
+            self.pages.clear()
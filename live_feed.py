@@ -0,0 +1,87 @@
+# live_feed.py - FSociety live submission feed
+# Created by Asero
+
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# Columns sent to dashboards for each kind of submission
+FIELDS = {
+    'recruit': ('id', 'handle', 'skills', 'message', 'status', 'timestamp'),
+    'contact': ('id', 'subject', 'message', 'timestamp'),
+}
+KINDS = tuple(FIELDS)
+
+
+def encode_position(position):
+    """Encode the last seen id per kind as an SSE event id, e.g. "120:45\""""
+    return ':'.join(str(position[kind]) for kind in KINDS)
+
+
+def decode_position(value):
+    """Decode an event id back into {kind: last id}, or None if missing or invalid"""
+    if not value:
+        return None
+    try:
+        ids = [int(part) for part in value.split(':')]
+    except ValueError:
+        return None
+    if len(ids) != len(KINDS):
+        return None
+    return dict(zip(KINDS, ids))
+
+
+def serialize(kind, source):
+    """Build the event payload from a model instance or a row mapping"""
+    get = source.get if isinstance(source, dict) else lambda name: getattr(source, name)
+    row = {}
+    for name in FIELDS[kind]:
+        value = get(name)
+        row[name] = value.isoformat() if isinstance(value, datetime) else value
+    return row
+
+
+def format_event(kind, row, position):
+    """Format one Server-Sent Event carrying a row"""
+    return f"id: {encode_position(position)}\nevent: {kind}\ndata: {json.dumps(row)}\n\n"
+
+
+class LiveFeed:
+    """Wake every dashboard stream in this process when a submission is committed.
+
+    A publish is only a signal: one notify_all wakes all waiting streams,
+    which then read the new rows with a primary key range select from their
+    last position. Reading from the database rather than passing rows along
+    means rows that were never published here (bulk inserts, other worker
+    processes) can't be skipped when a later published id moves a stream on.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.sequence = 0
+        self.listeners = 0
+
+    def publish(self):
+        """Signal that new rows have been committed"""
+        with self.condition:
+            self.sequence += 1
+            self.condition.notify_all()
+
+    @contextmanager
+    def subscribe(self):
+        """Count a connected stream for its lifetime, yielding the current sequence"""
+        with self.condition:
+            self.listeners += 1
+            sequence = self.sequence
+        try:
+            yield sequence
+        finally:
+            with self.condition:
+                self.listeners -= 1
+
+    def wait(self, after, timeout):
+        """Wait up to timeout for a publish after a sequence number, returning the current sequence"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.sequence > after, timeout)
+            return self.sequence
@@ -0,0 +1,58 @@
+# local_store.py - FSociety host-local SQLite stores
+# Created by Asero
+
+import os
+import threading
+import db_connection
+
+# Stores run their cleanup once every this many operations per process
+PRUNE_INTERVAL = 256
+
+
+class LocalStore:
+    """A small SQLite file shared by every worker process on the host.
+
+    Each thread gets its own autocommit connection with fsync off: the
+    stores built on this hold soft state only (dedup claims, rate limit
+    buckets), which a crash can lose without doing harm.
+    """
+
+    def __init__(self, path, schema):
+        self.path = path
+        self.local = threading.local()
+        self.operations = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self.connection()
+        for statement in schema:
+            conn.execute(statement)
+
+    def connection(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = db_connection.connect(self.path, pragmas={'synchronous': 'OFF'},
+                                                           isolation_level=None)
+        return conn
+
+    def due_for_prune(self):
+        """Count one operation, returning True once every PRUNE_INTERVAL"""
+        self.operations += 1
+        return self.operations % PRUNE_INTERVAL == 0
+
+
+class LazyBackend:
+    """Build a backend from the app config on first use, once even when threads race"""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.value = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        if self.value is None:
+            with self.lock:
+                if self.value is None:
+                    self.value = self.factory()
+        return self.value
@@ -0,0 +1,152 @@
+# metrics.py - FSociety request and database metrics
+# Created by Asero
+
+import time
+import threading
+from bisect import bisect_left
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# Upper bounds in seconds (latency) and statements (queries per request)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_bound(bound):
+    return repr(float(bound)) if isinstance(bound, float) else str(bound)
+
+
+class Histogram:
+    """A Prometheus-style histogram with one series per label tuple"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        """Record one observation; labels is a tuple matching label_names"""
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                # Per-bucket counts plus +Inf, then the running sum
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        """Return the histogram in the Prometheus text exposition format"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in sorted(self.series.items())]
+
+        for labels, counts, total in snapshot:
+            label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = label_text + ',' if label_text else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{_format_bound(bound)}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total!r}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+
+class Metrics:
+    """Per-route request latency and per-request database usage.
+
+    Request timing runs in before/after_request hooks and query timing in
+    SQLAlchemy cursor events; both only do a perf_counter() call and a few
+    additions, so the collector is cheap enough to leave on.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.started = time.time()
+        self.request_latency = Histogram(
+            'fsociety_http_request_duration_seconds', 'Time spent handling requests',
+            ('route', 'method', 'status'), LATENCY_BUCKETS)
+        self.request_queries = Histogram(
+            'fsociety_db_queries_per_request', 'SQL statements executed per request',
+            ('route',), QUERY_COUNT_BUCKETS)
+        self.request_db_time = Histogram(
+            'fsociety_db_time_per_request_seconds', 'Time spent in SQL statements per request',
+            ('route',), LATENCY_BUCKETS)
+        self.collectors = []
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+        # Only the app's own engine is timed, so db.init_app(app) must have run
+        with app.app_context():
+            engine = app.extensions['sqlalchemy'].db.engine
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _enabled(self):
+        return self.app.config.get('METRICS_ENABLED', True)
+
+    def _start_request(self):
+        if self._enabled():
+            g.metrics_start = time.perf_counter()
+            g.metrics_queries = 0
+            g.metrics_db_time = 0.0
+
+    def _record(self, status):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        # The URL rule rather than the path keeps label cardinality bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        self.request_latency.observe((route, request.method, str(status)), elapsed)
+        self.request_queries.observe((route,), g.get('metrics_queries', 0))
+        self.request_db_time.observe((route,), g.get('metrics_db_time', 0.0))
+
+    def _finish_request(self, response):
+        g.metrics_status = response.status_code
+        return response
+
+    def _teardown_request(self, error):
+        # Teardown runs after a streamed body has been sent, so /admin's page
+        # queries are counted; no status was recorded if the view raised
+        self._record(g.get('metrics_status', 500))
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'metrics_start' in g:
+            conn.info['metrics_query_start'] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop('metrics_query_start', None)
+        if start is not None and has_request_context():
+            g.metrics_queries = g.get('metrics_queries', 0) + 1
+            g.metrics_db_time = g.get('metrics_db_time', 0.0) + time.perf_counter() - start
+
+    def add_collector(self, collector):
+        """Include the lines returned by collector() in every render"""
+        self.collectors.append(collector)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        lines = [
+            '# HELP fsociety_process_start_time_seconds Unix time the process started',
+            '# TYPE fsociety_process_start_time_seconds gauge',
+            f'fsociety_process_start_time_seconds {self.started!r}',
+        ]
+        for histogram in (self.request_latency, self.request_queries, self.request_db_time):
+            lines.extend(histogram.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
@@ -4,6 +4,13 @@ from datetime import datetime
 # Initialize SQLAlchemy
 db = SQLAlchemy()
 
+# Answers to the recruitment security question
+VALID_PASSPHRASES = ['debt', 'evil corp', 'the system']
+
+def is_valid_passphrase(passphrase):
+    """Check a recruit's answer to the security question"""
+    return bool(passphrase) and passphrase.lower() in VALID_PASSPHRASES
+
 class Recruit(db.Model):
     """Model for storing FSociety recruitment submissions"""
     id = db.Column(db.Integer, primary_key=True)
@@ -16,6 +23,13 @@ class Recruit(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20), default="pending")  # pending, approved, rejected
     
+    # Keep in sync with db_migrations.py, which adds these to existing databases
+    __table_args__ = (
+        db.Index('ix_recruit_timestamp_id', 'timestamp', 'id'),
+        db.Index('ix_recruit_status_timestamp', 'status', 'timestamp'),
+        db.Index('ix_recruit_handle', 'handle'),
+    )
+    
     def __repr__(self):
         return f'<Recruit {self.handle}>'
 
@@ -28,5 +42,9 @@ class Contact(db.Model):
     ip_address = db.Column(db.String(50))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_contact_timestamp_id', 'timestamp', 'id'),
+    )
+    
     def __repr__(self):
         return f'<Contact {self.id}: {self.subject}>'
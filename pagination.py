@@ -0,0 +1,78 @@
+# pagination.py - FSociety keyset pagination helpers
+# Created by Asero
+
+from datetime import datetime
+from sqlalchemy import select, tuple_
+
+CURSOR_SEPARATOR = '~'
+
+
+def encode_cursor(timestamp, row_id):
+    """Encode a (timestamp, id) position as an opaque cursor string"""
+    return f"{timestamp.isoformat()}{CURSOR_SEPARATOR}{row_id}"
+
+
+def decode_cursor(cursor):
+    """Decode a cursor string back into (timestamp, id), or None if invalid"""
+    if not cursor:
+        return None
+    try:
+        timestamp_str, row_id = cursor.rsplit(CURSOR_SEPARATOR, 1)
+        return datetime.fromisoformat(timestamp_str), int(row_id)
+    except ValueError:
+        return None
+
+
+def keyset_query(model, cursor=None):
+    """Newest-first query over a model, starting after the given cursor position"""
+    query = model.query.order_by(model.timestamp.desc(), model.id.desc())
+    position = decode_cursor(cursor)
+    if position:
+        query = query.filter(tuple_(model.timestamp, model.id) < position)
+    return query
+
+
+class KeysetPage:
+    """A lazily fetched page of rows ordered by (timestamp, id) descending.
+
+    Rows are pulled from the database while the page is iterated, so a
+    streamed template starts sending output before the last row is loaded.
+    Once iteration finishes, ``next_cursor`` points at the following page.
+    """
+
+    def __init__(self, query, page_size, fetch_size=100):
+        self.query = query
+        self.page_size = page_size
+        self.fetch_size = fetch_size
+        self.next_cursor = None
+
+    def __iter__(self):
+        self.next_cursor = None
+        last = None
+        # Fetch one extra row to learn whether another page exists
+        for count, row in enumerate(self.query.limit(self.page_size + 1).yield_per(self.fetch_size)):
+            if count == self.page_size:
+                self.next_cursor = encode_cursor(last.timestamp, last.id)
+                break
+            last = row
+            yield row
+
+
+def keyset_select(columns, table, cursor=None, conditions=()):
+    """Newest-first Core select of the given columns, starting after the cursor position"""
+    query = select(*columns).where(*conditions).order_by(table.c.timestamp.desc(), table.c.id.desc())
+    position = decode_cursor(cursor)
+    if position:
+        query = query.where(tuple_(table.c.timestamp, table.c.id) < position)
+    return query
+
+
+def delta_select(columns, table, since_id, conditions=()):
+    """Oldest-first Core select of rows added after since_id, read as a primary key range"""
+    return select(*columns).where(table.c.id > since_id, *conditions).order_by(table.c.id)
+
+
+def fetch_rows(connection, query, limit):
+    """Run a select with one extra row and return (rows as dicts, has_more)"""
+    rows = connection.execute(query.limit(limit + 1)).mappings().all()
+    return [dict(row) for row in rows[:limit]], len(rows) > limit
@@ -0,0 +1,117 @@
+# rate_limit.py - FSociety per-IP rate limiting
+# Created by Asero
+
+import os
+import math
+import time
+import threading
+from flask import jsonify, request
+import local_store
+
+# Idle buckets are dropped once the memory backend holds this many
+DEFAULT_MAX_BUCKETS = 10000
+
+
+class MemoryBackend:
+    """Token buckets in a dict, for a single process"""
+
+    def __init__(self, max_buckets, idle_seconds):
+        self.max_buckets = max_buckets
+        self.idle_seconds = idle_seconds
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                if len(self.buckets) >= self.max_buckets:
+                    self.prune(now)
+                tokens = capacity
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            if tokens < 1:
+                bucket[0], bucket[1] = tokens, now
+                return (1 - tokens) / rate
+            self.buckets[key] = [tokens - 1, now]
+            return 0.0
+
+    def prune(self, now):
+        # A bucket idle long enough to have refilled is the same as no bucket
+        idle = [key for key, (_, updated) in self.buckets.items() if now - updated > self.idle_seconds]
+        if not idle:
+            # Everyone is active: drop the least recently used half
+            idle = sorted(self.buckets, key=lambda key: self.buckets[key][1])[:len(self.buckets) // 2]
+        for key in idle:
+            del self.buckets[key]
+
+
+class SQLiteBackend(local_store.LocalStore):
+    """Token buckets in a small SQLite file shared by every worker process on the host"""
+
+    def __init__(self, path, idle_seconds):
+        super().__init__(path, [
+            "CREATE TABLE IF NOT EXISTS bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL) WITHOUT ROWID",
+        ])
+        self.idle_seconds = idle_seconds
+
+    def take(self, key, capacity, rate, now):
+        conn = self.connection()
+        # One statement refills the bucket and takes a token, unless less than one is available
+        cursor = conn.execute(
+            "INSERT INTO bucket (key, tokens, updated) VALUES (?1, ?2 - 1, ?4) "
+            "ON CONFLICT (key) DO UPDATE SET tokens = min(?2, tokens + (?4 - updated) * ?3) - 1, updated = ?4 "
+            "WHERE min(?2, tokens + (?4 - updated) * ?3) >= 1",
+            (key, capacity, rate, now))
+        if self.due_for_prune():
+            conn.execute("DELETE FROM bucket WHERE updated < ?", (now - self.idle_seconds,))
+        if cursor.rowcount == 1:
+            return 0.0
+        row = conn.execute("SELECT tokens, updated FROM bucket WHERE key = ?", (key,)).fetchone()
+        tokens = min(capacity, row[0] + (now - row[1]) * rate) if row else 0
+        return max(1 - tokens, 0) / rate
+
+
+class RateLimiter:
+    """Per-IP token buckets for the endpoints named in RATE_LIMITS.
+
+    RATE_LIMITS maps an endpoint to (requests, seconds): a client may burst
+    up to `requests` and then gets one more every seconds/requests. Over the
+    limit the request is answered with 429 and Retry-After before the view,
+    and before it can queue on the database write lock.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.backend = local_store.LazyBackend(self._create_backend)
+        app.before_request(self._check)
+
+    def _create_backend(self):
+        config = self.app.config
+        # Buckets idle for the longest window have refilled and can be dropped
+        idle = max((seconds for _, seconds in config.get('RATE_LIMITS', {}).values()), default=60)
+        if config.get('RATE_LIMIT_BACKEND', 'memory') == 'sqlite':
+            path = config.get('RATE_LIMIT_SQLITE_PATH') or os.path.join(self.app.instance_path, 'rate_limit.db')
+            return SQLiteBackend(path, idle)
+        return MemoryBackend(config.get('RATE_LIMIT_MAX_BUCKETS', DEFAULT_MAX_BUCKETS), idle)
+
+    def _check(self):
+        if request.method != 'POST' or not self.app.config.get('RATE_LIMIT_ENABLED', True):
+            return None
+        limit = self.app.config.get('RATE_LIMITS', {}).get(request.endpoint)
+        if limit is None:
+            return None
+
+        requests, seconds = limit
+        wait = self.backend.get().take(f"{request.endpoint}|{request.remote_addr}", requests, requests / seconds,
+                                    time.time())
+        if not wait:
+            return None
+        retry_after = max(1, math.ceil(wait))
+        response = jsonify({
+            'status': 'error',
+            'message': f'Too many requests. Try again in {retry_after} seconds.'
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
@@ -10,7 +10,7 @@ echo.
 cd /d %~dp0
 
 :: Create automatic backup and rotate old backups
-py db_backup.py auto --max 10
+py db_backup.py auto --max 10 --store
 
 echo.
 echo Backup completed at %time%
@@ -8,7 +8,7 @@ py -m pip install -r requirements.txt
 echo.
 
 echo Setting up the database...
-py -c "from app import app; from models import db; app.app_context().push(); db.create_all()"
+py -c "from app import app, init_db; app.app_context().push(); init_db()"
 echo.
 
 echo Installing Click for the CLI tool...
@@ -0,0 +1,118 @@
+# write_queue.py - FSociety group-commit write pipeline
+# Created by Asero
+
+import queue
+import threading
+import time
+from sqlalchemy.orm import Session
+
+
+class PendingWrite:
+    """A submission waiting for its group to be committed"""
+
+    def __init__(self, record):
+        self.record = record
+        self.error = None
+        self.done = threading.Event()
+
+
+class GroupCommitWriter:
+    """Commit queued records in groups from a single background thread.
+
+    Submitting threads block until the group containing their record has
+    been committed, so a request still only returns once its row is
+    durable, but many requests share one transaction and one fsync.
+    """
+
+    def __init__(self, app, db, batch_size=100, interval_ms=5):
+        self.app = app
+        self.db = db
+        self.batch_size = batch_size
+        self.interval = interval_ms / 1000.0
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.batches = 0
+        self.records = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+
+    def start(self):
+        """Start the writer thread if it isn't already running in this process"""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+                self.thread.start()
+
+    def submit(self, record, timeout=30):
+        """Queue a record and wait until it has been committed"""
+        self.start()
+        pending = PendingWrite(record)
+        self.queue.put(pending)
+        if not pending.done.wait(timeout):
+            raise TimeoutError('Timed out waiting for group commit')
+        if pending.error:
+            raise pending.error
+        return record
+
+    def stats(self):
+        """Report queue depth and batch sizes"""
+        return {
+            'queue_depth': self.queue.qsize(),
+            'batch_size_limit': self.batch_size,
+            'interval_ms': self.interval * 1000,
+            'batches': self.batches,
+            'records': self.records,
+            'last_batch_size': self.last_batch_size,
+            'max_batch_size': self.max_batch_size,
+            'avg_batch_size': self.records / self.batches if self.batches else 0
+        }
+
+    def _collect(self):
+        """Block for the first record, then gather more until the batch is full or the interval ends"""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit(self, engine, batch):
+        """Commit a group of records in one transaction; on failure record the error on each"""
+        # expire_on_commit=False keeps committed attributes readable by the submitting threads
+        session = Session(bind=engine, expire_on_commit=False)
+        try:
+            session.add_all([pending.record for pending in batch])
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            for pending in batch:
+                pending.error = e
+            return False
+        finally:
+            session.close()
+
+    def _run(self):
+        with self.app.app_context():
+            engine = self.db.engine
+        while True:
+            batch = self._collect()
+            if not self._commit(engine, batch) and len(batch) > 1:
+                # One bad record must not fail its whole group: retry each on its own
+                # so only the offending submission gets the error
+                for pending in batch:
+                    pending.error = None
+                    self._commit(engine, [pending])
+
+            self.batches += 1
+            self.records += len(batch)
+            self.last_batch_size = len(batch)
+            self.max_batch_size = max(self.max_batch_size, len(batch))
+            for pending in batch:
+                pending.done.set()